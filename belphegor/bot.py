@@ -6,9 +6,15 @@ from bson.codec_options import TypeRegistry
 import traceback
 import aiohttp
 import redis.asyncio as aredis
+from pymongo.errors import PyMongoError
 
 from belphegor import utils
-from belphegor.db import MongoClientEX, MongoEX
+from belphegor.utils import metrics
+from belphegor.db import MongoClientEX, MongoEX, SharedQueryCache
+from belphegor.settings import settings
+from belphegor.templates import auto_defer
+from belphegor.templates.persistent import PersistentRouter
+from belphegor.templates.ui_ex import ViewRegistry
 
 #=============================================================================================================================#
 
@@ -26,6 +32,14 @@ class State:
 
 #=============================================================================================================================#
 
+class BelphegorTree(ac.CommandTree):
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if interaction.type is discord.InteractionType.application_command:
+            auto_defer.arm(interaction)
+        return True
+
+#=============================================================================================================================#
+
 class Belphegor(commands.Bot):
     mongo: MongoEX
     state: State
@@ -37,15 +51,20 @@ class Belphegor(commands.Bot):
         **kwargs
     ):
         self.initial_extensions = initial_extensions
-        super().__init__(*args, **kwargs)
+        self.metrics = metrics.MetricsRegistry()
+        self.metrics.describe("interaction_first_response_seconds", "Time from interaction creation to the first response sent")
+        super().__init__(*args, tree_cls = BelphegorTree, http_trace = metrics.http_trace(self.metrics), **kwargs)
 
         self.default_presence = default_presence
         self.start_timestamp = utils.now()
         self.state = State()
+        self.persistent_router = PersistentRouter()
+        self.view_registry = ViewRegistry(max_bytes = settings.VIEW_MEMORY_BUDGET, max_views = settings.MAX_LIVE_VIEWS)
         self.session: aiohttp.ClientSession = None
 
     async def setup_hook(self):
         self.session = aiohttp.ClientSession()
+        self.redis = aredis.Redis(host = "redis")
         mongo_client = MongoClientEX(
             host = "mongodb",
             port = 27017,
@@ -56,13 +75,29 @@ class Belphegor(commands.Bot):
             client = mongo_client,
             db = mongo_client.belphegor_db
         )
-
-        self.redis = aredis.Redis(host = "redis")
+        mongo_client.shared_cache = SharedQueryCache(self.redis)
+        mongo_client.shared_cache.start()
 
         for extension in self.initial_extensions:
             await self.load_extension(f"belphegor.extensions.{extension}")
             log.info(f"Done loading {extension}")
 
+        await self.reconcile_indexes()
+
+    async def reconcile_indexes(self):
+        """
+        Create the indexes declared by cogs in their `db_indexes` attribute.
+        """
+        for cog in self.cogs.values():
+            for name, indexes in getattr(cog, "db_indexes", {}).items():
+                try:
+                    created = await self.mongo.db[name].reconcile_indexes(indexes)
+                except PyMongoError as e:
+                    log.error(f"Failed to create indexes on {name}: {e!r}")
+                else:
+                    if created:
+                        log.info(f"Created indexes on {name}: {', '.join(created)}")
+
     async def on_ready(self):
         self.owner_id = self.application.owner.id
         log.info("Logged in as")
@@ -72,6 +107,9 @@ class Belphegor(commands.Bot):
         await asyncio.sleep(5)
         await self.change_presence(activity = self.default_presence)
 
+    async def on_interaction(self, interaction: discord.Interaction):
+        await self.persistent_router.dispatch(interaction)
+
     async def on_error(self, event, /, *args, **kwargs):
         log.error(f"{event} - args: {args} - kwargs: {kwargs}\n{traceback.format_exc()}")
 
@@ -80,5 +118,10 @@ class Belphegor(commands.Bot):
 
     async def close(self):
         await super().close()
+        pending = self.mongo.client.queue_registry.pending
+        flushed = await self.mongo.drain_queues(timeout = 10)
+        if pending:
+            log.info(f"Flushed {flushed}/{pending} pending database operations")
+        await self.mongo.client.shared_cache.stop()
         await self.session.close()
         await self.redis.aclose()
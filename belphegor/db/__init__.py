@@ -1 +1,6 @@
-from .mongo import MongoClientEX, MongoDatabaseEX, MongoCollectionEX, MongoEX, MongoQueue
\ No newline at end of file
+from .mongo import MongoClientEX, MongoDatabaseEX, MongoCollectionEX, MongoEX, MongoQueue, MongoQueueRegistry
+from .cache import QueryCache, SharedQueryCache
+from .profiler import QueryProfiler
+from .models import ModelCollection
+from .checkpoints import IngestCheckpoint
+from .ingest import ValidatedJSONStream, iter_json_array
\ No newline at end of file
@@ -0,0 +1,206 @@
+from collections import OrderedDict
+from bson.codec_options import CodecOptions
+import redis.asyncio as aredis
+import asyncio
+import weakref
+import bson
+import hashlib
+import time
+import typing
+
+from belphegor import utils
+
+#=============================================================================================================================#
+
+log = utils.get_logger()
+
+#=============================================================================================================================#
+
+def query_key(*parts: typing.Any) -> str:
+    """
+    Canonical hash of a query. BSON keeps key order, which matters for pipelines and sort specs, \
+    so equal queries always produce the same key and different stage orders never collide.
+    """
+    return hashlib.blake2b(bson.encode({"q": list(parts)}), digest_size = 16).hexdigest()
+
+def documents_size(docs: list[dict]) -> int:
+    return sum(len(bson.encode(doc)) for doc in docs)
+
+class _Entry:
+    __slots__ = ("docs", "size", "expires_at")
+
+    def __init__(self, docs: list[dict], size: int, expires_at: float):
+        self.docs = docs
+        self.size = size
+        self.expires_at = expires_at
+
+class QueryCache:
+    """
+    In-process LRU cache of query results, bounded by entry count, total BSON size and age. \
+    Cached documents are shared between callers and must not be mutated.
+    """
+
+    def __init__(self, *, max_entries: int = 256, max_bytes: int = 8 << 20, ttl: float = 300.0):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.generation = 0
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+
+    def get(self, key: str) -> list[dict] | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry.expires_at <= time.monotonic():
+            self._remove(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry.docs
+
+    def set(self, key: str, docs: list[dict], *, generation: int | None = None):
+        """Store a result, unless the cache has been invalidated since the query started at the given generation."""
+        if generation is not None and generation != self.generation:
+            return
+        size = documents_size(docs)
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = _Entry(docs, size, time.monotonic() + self.ttl)
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def invalidate(self):
+        self._entries.clear()
+        self._bytes = 0
+        self.generation += 1
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions
+        }
+
+#=============================================================================================================================#
+
+# returns the current version of a namespace along with the entry stored under it, in one round trip
+_GET_SCRIPT = """
+local version = redis.call("GET", KEYS[1]) or "0"
+return {version, redis.call("GET", ARGV[1] .. ":" .. version .. ":" .. ARGV[2])}
+"""
+
+class SharedQueryCache:
+    """
+    Second cache tier in Redis, shared by every bot process. Results are stored as BSON with a TTL, \
+    under keys that include a per-collection version. Invalidating bumps the version, so entries written by queries \
+    that raced with a write are never read, then publishes the collection name so every process drops its local caches.
+    """
+
+    def __init__(self, redis: aredis.Redis, *, prefix: str = "belphegor:query", channel: str = "belphegor:invalidate", ttl: int = 600):
+        self.redis = redis
+        self.prefix = prefix
+        self.channel = channel
+        self.ttl = ttl
+        self._get_script = redis.register_script(_GET_SCRIPT)
+        self._local: dict[str, weakref.WeakSet[QueryCache]] = {}
+        self._listener: asyncio.Task | None = None
+
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def register(self, namespace: str, cache: QueryCache):
+        self._local.setdefault(namespace, weakref.WeakSet()).add(cache)
+
+    def _invalidate_local(self, namespace: str):
+        for cache in self._local.get(namespace, ()):
+            cache.invalidate()
+
+    async def get(self, namespace: str, key: str, *, codec_options: CodecOptions) -> tuple[str | None, list[dict] | None]:
+        """Return the current version of the namespace and the cached documents if any."""
+        try:
+            version, data = await self._get_script(keys = [f"{self.prefix}:{namespace}:version"], args = [f"{self.prefix}:{namespace}", key])
+        except aredis.RedisError as e:
+            self.errors += 1
+            log.warning(f"Shared cache read failed: {e!r}")
+            return None, None
+        version = version.decode()
+        if data is None:
+            self.misses += 1
+            return version, None
+        self.hits += 1
+        return version, bson.decode(data, codec_options = codec_options)["docs"]
+
+    async def set(self, namespace: str, key: str, version: str | None, docs: list[dict]):
+        if version is None:
+            return
+        try:
+            await self.redis.set(f"{self.prefix}:{namespace}:{version}:{key}", bson.encode({"docs": docs}), ex = self.ttl)
+        except aredis.RedisError as e:
+            self.errors += 1
+            log.warning(f"Shared cache write failed: {e!r}")
+
+    async def invalidate(self, namespace: str):
+        self._invalidate_local(namespace)
+        try:
+            async with self.redis.pipeline(transaction = True) as pipe:
+                pipe.incr(f"{self.prefix}:{namespace}:version")
+                pipe.publish(self.channel, namespace)
+                await pipe.execute()
+        except aredis.RedisError as e:
+            self.errors += 1
+            log.warning(f"Shared cache invalidation failed: {e!r}")
+
+    async def _listen(self):
+        while True:
+            pubsub = self.redis.pubsub(ignore_subscribe_messages = True)
+            try:
+                await pubsub.subscribe(self.channel)
+                async for message in pubsub.listen():
+                    self._invalidate_local(message["data"].decode())
+            except aredis.RedisError as e:
+                log.warning(f"Lost cache invalidation channel: {e!r}")
+                # anything could have been written in between
+                for namespace in self._local:
+                    self._invalidate_local(namespace)
+                await asyncio.sleep(5)
+            finally:
+                await pubsub.aclose()
+
+    def start(self):
+        if self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        task = self._listener
+        if task is not None:
+            self._listener = None
+            task.cancel()
+            await asyncio.gather(task, return_exceptions = True)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors
+        }
@@ -0,0 +1,104 @@
+from bson import ObjectId
+import typing
+
+from belphegor import utils
+from .mongo import MongoCollectionEX
+
+#=============================================================================================================================#
+
+IngestStatus: typing.TypeAlias = typing.Literal["pending", "passed", "failed"]
+
+class IngestCheckpoint:
+    """
+    Persisted progress of an ingestion job, so it can be resumed after a restart. \
+    The whole job is a single document holding the name list, a status per name and the last index \
+    before which every name has been processed.
+    """
+
+    def __init__(self, collection: MongoCollectionEX, doc: dict):
+        self._collection = collection
+        self.id: ObjectId = doc["_id"]
+        self.kind: str = doc["kind"]
+        self.names: list[str] = doc["names"]
+        self.statuses: list[IngestStatus] = doc["statuses"]
+        self.errors: dict[str, str] = doc.get("errors", {})
+        self.last_index: int = doc.get("last_index", -1)
+        self.finished: bool = doc.get("finished", False)
+
+    @classmethod
+    async def create(cls, collection: MongoCollectionEX, kind: str, names: list[str]) -> typing.Self:
+        now = utils.now()
+        doc = {
+            "kind": kind,
+            "names": names,
+            "statuses": ["pending"] * len(names),
+            "errors": {},
+            "last_index": -1,
+            "finished": False,
+            "created_at": now,
+            "updated_at": now
+        }
+        result = await collection.insert_one(doc)
+        doc["_id"] = result.inserted_id
+        return cls(collection, doc)
+
+    @classmethod
+    async def latest(cls, collection: MongoCollectionEX, kind: str, *, unfinished_only: bool = False) -> typing.Self | None:
+        query = {"kind": kind}
+        if unfinished_only:
+            query["finished"] = False
+        doc = await collection.find_one(query, sort = [("created_at", -1)])
+        if doc is None:
+            return None
+        else:
+            return cls(collection, doc)
+
+    def indices(self, status: IngestStatus) -> list[int]:
+        return [i for i, s in enumerate(self.statuses) if s == status]
+
+    def count(self, status: IngestStatus) -> int:
+        return self.statuses.count(status)
+
+    def _advance_last_index(self) -> int:
+        i = self.last_index
+        statuses = self.statuses
+        while i + 1 < len(statuses) and statuses[i + 1] == "passed":
+            i += 1
+        self.last_index = i
+        return i
+
+    async def mark(self, index: int, status: IngestStatus, *, error: str | None = None):
+        self.statuses[index] = status
+        key = str(index)
+        # concurrent marks may land out of order, last_index must never go back
+        update = {
+            "$set": {
+                f"statuses.{index}": status,
+                "updated_at": utils.now()
+            },
+            "$max": {
+                "last_index": self._advance_last_index()
+            }
+        }
+        if error is None:
+            self.errors.pop(key, None)
+            update["$unset"] = {f"errors.{key}": ""}
+        else:
+            self.errors[key] = error
+            update["$set"][f"errors.{key}"] = error
+
+        await self._collection.update_one({"_id": self.id}, update)
+
+    async def finish(self):
+        self.finished = self.count("pending") == 0
+        await self._collection.update_one(
+            {
+                "_id": self.id
+            },
+            {
+                "$set": {
+                    "finished": self.finished,
+                    "updated_at": utils.now()
+                }
+            }
+        )
@@ -0,0 +1,78 @@
+from pydantic import BaseModel, TypeAdapter, ValidationError
+from collections.abc import AsyncIterable, AsyncIterator
+import asyncio
+import codecs
+import typing
+
+from belphegor import utils
+
+#=============================================================================================================================#
+
+async def iter_json_array(chunks: AsyncIterable[bytes]) -> AsyncIterator[typing.Any]:
+    """Yield elements of a JSON array from a stream of utf-8 encoded chunks."""
+    text_decoder = codecs.getincrementaldecoder("utf-8")()
+    decoder = utils.JSONArrayStreamDecoder()
+    async for chunk in chunks:
+        for item in decoder.feed(text_decoder.decode(chunk)):
+            yield item
+    for item in decoder.feed(text_decoder.decode(b"", final = True)):
+        yield item
+    for item in decoder.close():
+        yield item
+
+def _validate_batch(adapter: TypeAdapter, items: list, first_index: int) -> tuple[list[dict], list[tuple[int, str]]]:
+    valid = []
+    invalid = []
+    for i, item in enumerate(items, first_index):
+        try:
+            obj = adapter.validate_python(item)
+        except ValidationError as e:
+            invalid.append((i, str(e)))
+        else:
+            valid.append(adapter.dump_python(obj))
+    return valid, invalid
+
+class ValidatedJSONStream(AsyncIterator[dict]):
+    """
+    Decode a JSON array from a byte stream and validate its elements against a model in batches. \
+    Valid elements are yielded as dumped documents, invalid ones are recorded in `errors` with their array index. \
+    With `offload`, validation runs in a worker thread so big files don't block the event loop.
+    """
+
+    def __init__(self, chunks: AsyncIterable[bytes], model: type[BaseModel], *, batch_size: int = 500, offload: bool = False):
+        self.adapter = TypeAdapter(model)
+        self.batch_size = batch_size
+        self.offload = offload
+        self.errors: list[tuple[int, str]] = []
+        self.count = 0
+        self._iter = self._validate(chunks)
+
+    async def _validate_batch(self, items: list, first_index: int) -> list[dict]:
+        if self.offload:
+            valid, invalid = await asyncio.to_thread(_validate_batch, self.adapter, items, first_index)
+        else:
+            valid, invalid = _validate_batch(self.adapter, items, first_index)
+        self.errors.extend(invalid)
+        return valid
+
+    async def _validate(self, chunks: AsyncIterable[bytes]) -> AsyncIterator[dict]:
+        batch = []
+        first_index = 0
+        async for item in iter_json_array(chunks):
+            batch.append(item)
+            if len(batch) >= self.batch_size:
+                for doc in await self._validate_batch(batch, first_index):
+                    yield doc
+                first_index += len(batch)
+                batch = []
+        if batch:
+            for doc in await self._validate_batch(batch, first_index):
+                yield doc
+            first_index += len(batch)
+        self.count = first_index
+
+    def __aiter__(self) -> AsyncIterator[dict]:
+        return self
+
+    async def __anext__(self) -> dict:
+        return await self._iter.__anext__()
@@ -0,0 +1,70 @@
+from pydantic import BaseModel, TypeAdapter
+from collections.abc import AsyncIterator
+import functools
+import typing
+
+if typing.TYPE_CHECKING:
+    from .mongo import MongoCollectionEX
+
+#=============================================================================================================================#
+
+_M = typing.TypeVar("_M", bound = BaseModel)
+
+@functools.cache
+def model_projection(model: type[BaseModel]) -> dict[str, int]:
+    projection = {"_id": 0}
+    for name, field in model.model_fields.items():
+        projection[field.alias or name] = 1
+    return projection
+
+@functools.cache
+def list_adapter(model: type[_M]) -> TypeAdapter[list[_M]]:
+    return TypeAdapter(list[model])
+
+#=============================================================================================================================#
+
+class ModelCollection(typing.Generic[_M]):
+    """
+    A collection bound to a pydantic model. Queries are projected to the model fields \
+    and results are decoded into models, whole batches at once where possible.
+    Decoding goes through pydantic-core, which is faster than building nested models with `model_construct` in python.
+    """
+
+    def __init__(self, collection: "MongoCollectionEX", model: type[_M]):
+        self.collection = collection
+        self.model = model
+        self.projection = model_projection(model)
+        self._adapter = list_adapter(model)
+
+    def decode(self, doc: dict) -> _M:
+        return self.model.model_validate(doc)
+
+    def decode_many(self, docs: list[dict]) -> list[_M]:
+        return self._adapter.validate_python(docs)
+
+    def _projected(self, pipeline: list[dict]) -> list[dict]:
+        return [*pipeline, {"$project": self.projection}]
+
+    async def aggregate(self, pipeline: list[dict], **kwargs) -> AsyncIterator[_M]:
+        async for doc in self.collection.aggregate(self._projected(pipeline), **kwargs):
+            yield self.decode(doc)
+
+    async def find(self, filter: dict | None = None, **kwargs) -> AsyncIterator[_M]:
+        async for doc in self.collection.find(filter or {}, self.projection, **kwargs):
+            yield self.decode(doc)
+
+    async def find_one(self, filter: dict | None = None, **kwargs) -> _M | None:
+        doc = await self.collection.find_one(filter or {}, self.projection, **kwargs)
+        if doc is None:
+            return None
+        else:
+            return self.decode(doc)
+
+    async def to_list(self, pipeline: list[dict], **kwargs) -> list[_M]:
+        return self.decode_many(await self.collection.aggregate(self._projected(pipeline), **kwargs).to_list(None))
+
+    async def cached_aggregate(self, pipeline: list[dict], **kwargs) -> list[_M]:
+        return self.decode_many(await self.collection.cached_aggregate(self._projected(pipeline), **kwargs))
+
+    async def cached_find(self, filter: dict | None = None, **kwargs) -> list[_M]:
+        return self.decode_many(await self.collection.cached_find(filter or {}, self.projection, **kwargs))
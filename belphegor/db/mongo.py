@@ -1,48 +1,331 @@
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase, AsyncIOMotorCollection
 from motor.core import AgnosticCollection, AgnosticDatabase, AgnosticClient
 from pydantic import BaseModel
-from pymongo.errors import BulkWriteError
-from collections.abc import Callable
+from pymongo import InsertOne, ReplaceOne, DeleteOne, IndexModel
+from pymongo.errors import BulkWriteError, ConnectionFailure, DuplicateKeyError, PyMongoError
+from bson import ObjectId
+import bson
+from collections.abc import Callable, Iterable, AsyncIterable, Sequence
+import asyncio
+import random
 import inspect
 import typing
+import hashlib
+import json
+import time
 
 from belphegor import utils
+from .cache import QueryCache, SharedQueryCache, query_key
+from .profiler import QueryProfiler, ProfiledCursor, shape_string
+from .models import ModelCollection
+
+#=============================================================================================================================#
+
+log = utils.get_logger()
+
+#=============================================================================================================================#
+
+def content_hash(doc: dict, *, exclude: Iterable[str] = ("_id",)) -> str:
+    """Hash a document by its content, regardless of key order."""
+    exclude = set(exclude)
+    canonical = json.dumps(
+        {k: v for k, v in doc.items() if k not in exclude},
+        sort_keys = True,
+        separators = (",", ":"),
+        ensure_ascii = False,
+        default = str
+    )
+    return hashlib.blake2b(canonical.encode("utf-8"), digest_size = 16).hexdigest()
+
+class SyncResult:
+    def __init__(self):
+        self.inserted: list[tuple] = []
+        self.updated: list[tuple] = []
+        self.deleted: list[tuple] = []
+        self.unchanged: int = 0
+
+    @property
+    def changed(self) -> int:
+        return len(self.inserted) + len(self.updated) + len(self.deleted)
+
+    def summary(self) -> str:
+        return f"Inserted: {len(self.inserted)}\nUpdated: {len(self.updated)}\nDeleted: {len(self.deleted)}\nUnchanged: {self.unchanged}"
+
+#=============================================================================================================================#
+
+# network blips, primary stepdowns and shutdowns, which are worth retrying
+RETRYABLE_ERROR_CODES = frozenset({6, 7, 89, 91, 189, 262, 9001, 10107, 11600, 11602, 13435, 13436})
+
+def is_transient_error(error: PyMongoError) -> bool:
+    return (
+        isinstance(error, ConnectionFailure)
+        or error.has_error_label("RetryableWriteError")
+        or getattr(error, "code", None) in RETRYABLE_ERROR_CODES
+    )
+
+class FailedOperation:
+    def __init__(self, request, code: int | None, message: str):
+        self.request = request
+        self.code = code
+        self.message = message
+
+    def __repr__(self):
+        return f"<FailedOperation code={self.code} message={self.message!r} request={self.request!r}>"
+
+class MongoQueueResult:
+    """Running totals of what a queue has written, and every operation that failed for good."""
+
+    def __init__(self):
+        self.inserted = 0
+        self.matched = 0
+        self.modified = 0
+        self.deleted = 0
+        self.upserted = 0
+        self.retries = 0
+        self.failed: list[FailedOperation] = []
+
+    def add(self, bulk_api_result: dict):
+        self.inserted += bulk_api_result.get("nInserted", 0)
+        self.matched += bulk_api_result.get("nMatched", 0)
+        self.modified += bulk_api_result.get("nModified", 0)
+        self.deleted += bulk_api_result.get("nRemoved", 0)
+        self.upserted += bulk_api_result.get("nUpserted", 0)
 
 #=============================================================================================================================#
 
 class MongoQueue:
-    def __init__(self, collection: "MongoCollectionEX", size: int = 1000, *, ordered: bool = True, callback: Callable[[Exception | None], typing.Any] | None = None):
+    """
+    Buffer write requests and send them in bulk once the buffer is full.
+    With concurrency above 1, full batches are written in background while the producer keeps filling the next one, \
+    and `write` only waits when all slots are busy. Batches may then finish out of order even in ordered mode.
+    With linger, a partial batch is flushed at most that many seconds after its first item, \
+    so long-lived queues with low write rate still have bounded latency.
+    Operations failing with transient errors are retried with backoff, the rest are collected in `result.failed` \
+    and passed to on_error. Note that retrying a whole batch after a network error may report duplicate key errors \
+    for inserts that actually went through.
+    Used as an async context manager, the queue is closed on exit, or cancelled if the block raised: \
+    batches already sent may have gone through, but the buffered operations are discarded.
+    """
+
+    def __init__(
+        self,
+        collection: "MongoCollectionEX",
+        size: int = 1000,
+        *,
+        ordered: bool = True,
+        concurrency: int = 1,
+        linger: float | None = None,
+        max_retries: int = 3,
+        retry_delay: float = 0.5,
+        on_error: Callable[[list[FailedOperation]], typing.Any] | None = None,
+        callback: Callable[[Exception | None], typing.Any] | None = None,
+        registry: "MongoQueueRegistry | None" = None
+    ):
         self._collection = collection
         self._size = size
         self._ordered = ordered
         self._queue = []
         self._is_closed = False
         self._callback = callback
+        self._concurrency = max(1, concurrency)
+        self._slots = asyncio.Semaphore(self._concurrency)
+        self._in_flight: set[asyncio.Task] = set()
+        self._in_flight_ops = 0
+        self._errors: list[Exception] = []
+        self._linger = linger
+        self._linger_task: asyncio.Task | None = None
+        self._linger_flush: asyncio.Future | None = None
+        self._has_items = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._batch_started = 0.0
+        self._max_retries = max_retries
+        self._retry_delay = retry_delay
+        self._on_error = on_error
+        self.result = MongoQueueResult()
+        self._registry = registry
+        if registry is not None:
+            registry.add(self)
+
+    @property
+    def collection(self) -> "MongoCollectionEX":
+        return self._collection
+
+    @property
+    def pending(self) -> int:
+        """Number of operations buffered or in flight."""
+        return len(self._queue) + self._in_flight_ops
+
+    def _unregister(self):
+        if self._registry is not None:
+            self._registry.discard(self)
+
+    async def _report(self, failed: list[FailedOperation]):
+        self.result.failed.extend(failed)
+        if self._on_error is not None:
+            maybe_coro = self._on_error(failed)
+            if inspect.isawaitable(maybe_coro):
+                await maybe_coro
+
+    async def _write_batch(self, batch: list):
+        attempt = 0
+        while True:
+            try:
+                result = await self._collection.bulk_write(batch, ordered = self._ordered)
+            except BulkWriteError as e:
+                last_error = e
+                details = e.details
+                self.result.add(details)
+                write_errors = details.get("writeErrors", [])
+                failed = [
+                    FailedOperation(batch[error["index"]], error.get("code"), error.get("errmsg", ""))
+                    for error in write_errors if error.get("code") not in RETRYABLE_ERROR_CODES
+                ]
+                if self._ordered:
+                    if failed:
+                        await self._report(failed)
+                        raise
+                    # ordered writes stop at the first error, so everything from there has to be retried
+                    batch = batch[write_errors[0]["index"]:] if write_errors else batch
+                else:
+                    if failed:
+                        await self._report(failed)
+                    batch = [batch[error["index"]] for error in write_errors if error.get("code") in RETRYABLE_ERROR_CODES]
+                    if not batch:
+                        return
+            except PyMongoError as e:
+                if not is_transient_error(e):
+                    raise
+                last_error = e
+            else:
+                self.result.add(result.bulk_api_result)
+                return
+
+            attempt += 1
+            if attempt > self._max_retries:
+                code = getattr(last_error, "code", None)
+                await self._report([FailedOperation(request, code, str(last_error)) for request in batch])
+                if self._ordered:
+                    raise last_error
+                return
+            self.result.retries += 1
+            await asyncio.sleep(random.uniform(0, self._retry_delay * 2 ** attempt))
+
+    async def _run_batch(self, batch: list):
+        try:
+            await self._write_batch(batch)
+        except Exception as e:
+            self._errors.append(e)
+        finally:
+            self._in_flight_ops -= len(batch)
+            self._slots.release()
+
+    def _raise_errors(self):
+        errors = self._errors
+        if errors:
+            self._errors = []
+            if len(errors) == 1:
+                raise errors[0]
+            else:
+                raise ExceptionGroup("Multiple batches failed to write", errors)
+
+    async def _linger_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._has_items.wait()
+            delay = self._batch_started + self._linger - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            else:
+                # shielded so that closing the queue mid-flush doesn't lose the swapped out batch
+                self._linger_flush = asyncio.ensure_future(self._flush_lingering())
+                await asyncio.shield(self._linger_flush)
+
+    async def _flush_lingering(self):
+        try:
+            await self.flush()
+        except Exception as e:
+            # recorded before the flush lock wakes up the next flush, which must see it in ordered mode
+            self._errors.append(e)
+
+    async def flush(self):
+        """
+        Send the current buffer, either inline or as a new in-flight batch. \
+        Flushes are serialized, so a linger flush and a full buffer never write at the same time, \
+        and in ordered mode nothing is sent after a batch failed.
+        """
+        async with self._flush_lock:
+            if self._ordered:
+                self._raise_errors()
+            self._has_items.clear()
+            if not self._queue:
+                return
+            batch = self._queue
+            self._queue = []
+            if self._concurrency == 1:
+                await self._write_batch(batch)
+            else:
+                await self._slots.acquire()
+                self._in_flight_ops += len(batch)
+                task = asyncio.create_task(self._run_batch(batch))
+                self._in_flight.add(task)
+                task.add_done_callback(self._in_flight.discard)
 
     async def write(self, item):
         if self._is_closed:
             raise RuntimeError("Queue is closed")
+        if self._ordered:
+            self._raise_errors()
         queue = self._queue
         queue.append(item)
+        if self._linger is not None and len(queue) == 1:
+            self._batch_started = asyncio.get_running_loop().time()
+            self._has_items.set()
+            if self._linger_task is None:
+                self._linger_task = asyncio.create_task(self._linger_loop())
         if len(queue) >= self._size:
-            try:
-                await self._collection.bulk_write(queue, ordered = self._ordered)
-            except BulkWriteError:
-                if self._ordered:
-                    raise
-            queue.clear()
+            await self.flush()
 
     def clear(self):
         self._queue.clear()
+        self._has_items.clear()
 
-    async def close(self):
-        self._is_closed = True
-        if self._queue:
+    async def _stop_linger(self):
+        task = self._linger_task
+        if task is not None:
+            self._linger_task = None
+            task.cancel()
+            await asyncio.gather(task, return_exceptions = True)
+        flushing = self._linger_flush
+        if flushing is not None:
+            self._linger_flush = None
             try:
-                await self._collection.bulk_write(self._queue, ordered = self._ordered)
-            except BulkWriteError:
-                if self._ordered:
-                    raise
+                await flushing
+            except Exception as e:
+                self._errors.append(e)
+
+    async def cancel(self):
+        """Discard the buffer and stop waiting for in-flight batches."""
+        self._is_closed = True
+        self._unregister()
+        await self._stop_linger()
+        self.clear()
+        for task in self._in_flight:
+            task.cancel()
+        await asyncio.gather(*self._in_flight, return_exceptions = True)
+        self._errors.clear()
+
+    async def close(self) -> MongoQueueResult:
+        """Flush the buffer, then wait for every in-flight batch and raise their errors if any."""
+        self._is_closed = True
+        await self._stop_linger()
+        try:
+            await self.flush()
+        finally:
+            if self._in_flight:
+                await asyncio.gather(*self._in_flight)
+            self._unregister()
+        self._raise_errors()
+        return self.result
 
     async def __aenter__(self):
         return self
@@ -53,23 +336,440 @@ class MongoQueue:
             if inspect.isawaitable(maybe_coro):
                 await maybe_coro
         if exc_value is not None:
+            # the buffer may be half built, drop it rather than letting the linger task or the registry flush it later
+            await self.cancel()
             return False
         else:
             await self.close()
             return True
 
-    def __del__(self):
-        utils.ensure_task(self.close())
+class MongoQueueRegistry:
+    """
+    Open queues of a client, so buffered writes can be flushed deterministically on shutdown \
+    instead of relying on garbage collection. Queues remove themselves once closed or cancelled.
+    """
+
+    def __init__(self):
+        self._queues: set[MongoQueue] = set()
+
+    def add(self, queue: MongoQueue):
+        self._queues.add(queue)
+
+    def discard(self, queue: MongoQueue):
+        self._queues.discard(queue)
+
+    def __len__(self) -> int:
+        return len(self._queues)
+
+    @property
+    def pending(self) -> int:
+        return sum(queue.pending for queue in self._queues)
+
+    async def drain(self, timeout: float | None = None) -> int:
+        """Close all open queues concurrently and return the number of operations flushed. \
+        Queues that don't finish within timeout are cancelled."""
+        queues = list(self._queues)
+        if not queues:
+            return 0
+
+        pending = {queue: queue.pending for queue in queues}
+        tasks = {asyncio.create_task(queue.close()): queue for queue in queues}
+        done, not_done = await asyncio.wait(tasks, timeout = timeout)
+
+        flushed = 0
+        for task in done:
+            queue = tasks[task]
+            error = task.exception()
+            if error is None:
+                flushed += pending[queue]
+            else:
+                log.error(f"Failed to flush queue of {queue.collection.name}: {error!r}")
+        for task in not_done:
+            queue = tasks[task]
+            log.warning(f"Timed out flushing queue of {queue.collection.name}, up to {pending[queue]} operations lost")
+            task.cancel()
+        if not_done:
+            await asyncio.gather(*not_done, return_exceptions = True)
+            for task in not_done:
+                await tasks[task].cancel()
+
+        return flushed
 
 #=============================================================================================================================#
 
+def index_drift(spec: dict, info: dict) -> list[str]:
+    """Compare a declared index document with the one reported by index_information and return the differing options."""
+    drift = []
+    if list(spec["key"].items()) != [tuple(k) for k in info["key"]]:
+        drift.append("key")
+    for option in ("unique", "sparse"):
+        if bool(spec.get(option)) != bool(info.get(option)):
+            drift.append(option)
+    for option in ("partialFilterExpression", "expireAfterSeconds"):
+        if spec.get(option) != info.get(option):
+            drift.append(option)
+    # the server fills in every collation default, only compare what was declared
+    expected = spec.get("collation")
+    actual = info.get("collation")
+    if (expected is None) != (actual is None) or (expected and any(actual.get(k) != v for k, v in expected.items())):
+        drift.append("collation")
+    return drift
+
+#=============================================================================================================================#
+
+_M = typing.TypeVar("_M", bound = BaseModel)
+
 MotorCollectionBase = typing.cast(type[AgnosticCollection], AsyncIOMotorCollection)
 class MongoCollectionEX(MotorCollectionBase):
-    def batch_write(self, batch_size: int = 1000, *, ordered: bool = True, callback: Callable[[Exception | None], typing.Any] | None = None) -> MongoQueue:
+    _cache: QueryCache | None = None
+    _shared_cache: SharedQueryCache | None = None
+
+    @property
+    def namespace(self) -> str:
+        return f"{self.database.name}.{self.name}"
+
+    def with_cache(self, *, max_entries: int = 256, max_bytes: int = 8 << 20, ttl: float = 300.0, shared: bool = True) -> typing.Self:
+        """
+        Enable result caching for cached_aggregate and cached_find on this instance.
+        The cache is invalidated by any write made through this same instance, so keep it around as an attribute \
+        and route writes through it. Pipelines reading other collections with $lookup are not invalidated by writes to those.
+        If the client has a shared cache, results are also shared with other processes and writes invalidate them everywhere.
+        """
+        self._cache = QueryCache(max_entries = max_entries, max_bytes = max_bytes, ttl = ttl)
+        if shared:
+            self._shared_cache = getattr(self.database.client, "shared_cache", None)
+            if self._shared_cache is not None:
+                self._shared_cache.register(self.namespace, self._cache)
+        return self
+
+    @property
+    def cache(self) -> QueryCache | None:
+        return self._cache
+
+    async def invalidate_cache(self):
+        if self._cache is not None:
+            self._cache.invalidate()
+            if self._shared_cache is not None:
+                await self._shared_cache.invalidate(self.namespace)
+
+    async def _cached(self, key: str, query: Callable[[], typing.Any]) -> list[dict]:
+        cache = self._cache
+        if cache is None:
+            return await query().to_list(None)
+        docs = cache.get(key)
+        if docs is None:
+            generation = cache.generation
+            shared = self._shared_cache
+            if shared is None:
+                docs = await query().to_list(None)
+            else:
+                version, docs = await shared.get(self.namespace, key, codec_options = self.codec_options)
+                if docs is None:
+                    docs = await query().to_list(None)
+                    await shared.set(self.namespace, key, version, docs)
+            cache.set(key, docs, generation = generation)
+        return docs
+
+    async def cached_aggregate(self, pipeline: list[dict], **kwargs) -> list[dict]:
+        return await self._cached(
+            query_key(self.name, "aggregate", pipeline, kwargs),
+            lambda: self.aggregate(pipeline, **kwargs)
+        )
+
+    async def cached_find(self, filter: dict | None = None, projection: dict | None = None, **kwargs) -> list[dict]:
+        return await self._cached(
+            query_key(self.name, "find", filter or {}, projection, kwargs),
+            lambda: self.find(filter, projection, **kwargs)
+        )
+
+    def bind(self, model: type[_M]) -> ModelCollection[_M]:
+        """Bind this collection to a pydantic model, see ModelCollection."""
+        return ModelCollection(self, model)
+
+    @property
+    def profiler(self) -> QueryProfiler | None:
+        profiler = getattr(self.database.client, "profiler", None)
+        if profiler is not None and profiler.enabled:
+            return profiler
+        else:
+            return None
+
+    def _explainer(self, command: dict) -> Callable[[], typing.Awaitable[dict]]:
+        return lambda: self.database.command("explain", command, verbosity = "executionStats")
+
+    def _record(self, op: str, query: typing.Any, duration: float, **kwargs):
+        profiler = self.profiler
+        if profiler is not None:
+            profiler.record(self.namespace, op, shape_string(query), duration, **kwargs)
+
+    def aggregate(self, pipeline: list[dict], *args, **kwargs):
+        cursor = super().aggregate(pipeline, *args, **kwargs)
+        profiler = self.profiler
+        if profiler is None:
+            return cursor
+        command = {"aggregate": self.name, "pipeline": pipeline, "cursor": {}}
+        if kwargs.get("collation") is not None:
+            command["collation"] = kwargs["collation"]
+        return ProfiledCursor(cursor, profiler, self.namespace, "aggregate", shape_string(pipeline), self._explainer(command))
+
+    def find(self, *args, **kwargs):
+        cursor = super().find(*args, **kwargs)
+        profiler = self.profiler
+        if profiler is None:
+            return cursor
+        filter = args[0] if args else kwargs.get("filter")
+        command = {"find": self.name, "filter": filter or {}}
+        projection = args[1] if len(args) > 1 else kwargs.get("projection")
+        if projection is not None:
+            command["projection"] = projection
+        return ProfiledCursor(cursor, profiler, self.namespace, "find", shape_string(filter or {}), self._explainer(command))
+
+    async def find_one(self, filter: dict | None = None, *args, **kwargs):
+        start = time.perf_counter()
+        doc = await super().find_one(filter, *args, **kwargs)
+        duration = time.perf_counter() - start
+        profiler = self.profiler
+        if profiler is not None:
+            profiler.record(
+                self.namespace,
+                "find_one",
+                shape_string(filter or {}),
+                duration,
+                docs = int(doc is not None),
+                nbytes = len(bson.encode(doc)) if doc is not None and profiler.measure_bytes else 0,
+                explain = self._explainer({"find": self.name, "filter": filter or {}, "limit": 1})
+            )
+        return doc
+
+    async def count_documents(self, filter: dict, *args, **kwargs) -> int:
+        start = time.perf_counter()
+        count = await super().count_documents(filter, *args, **kwargs)
+        self._record("count_documents", filter, time.perf_counter() - start)
+        return count
+
+    async def _write(self, op: str, query: typing.Any, method: Callable[..., typing.Awaitable], *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await method(*args, **kwargs)
+        finally:
+            self._record(op, query, time.perf_counter() - start)
+            await self.invalidate_cache()
+
+    async def insert_one(self, document: dict, *args, **kwargs):
+        return await self._write("insert_one", None, super().insert_one, document, *args, **kwargs)
+
+    async def insert_many(self, documents: Iterable[dict], *args, **kwargs):
+        return await self._write("insert_many", None, super().insert_many, documents, *args, **kwargs)
+
+    async def update_one(self, filter: dict, *args, **kwargs):
+        return await self._write("update_one", filter, super().update_one, filter, *args, **kwargs)
+
+    async def update_many(self, filter: dict, *args, **kwargs):
+        return await self._write("update_many", filter, super().update_many, filter, *args, **kwargs)
+
+    async def replace_one(self, filter: dict, *args, **kwargs):
+        return await self._write("replace_one", filter, super().replace_one, filter, *args, **kwargs)
+
+    async def delete_one(self, filter: dict, *args, **kwargs):
+        return await self._write("delete_one", filter, super().delete_one, filter, *args, **kwargs)
+
+    async def delete_many(self, filter: dict, *args, **kwargs):
+        return await self._write("delete_many", filter, super().delete_many, filter, *args, **kwargs)
+
+    async def bulk_write(self, requests: list, *args, **kwargs):
+        return await self._write("bulk_write", None, super().bulk_write, requests, *args, **kwargs)
+
+    async def drop(self, *args, **kwargs):
+        return await self._write("drop", None, super().drop, *args, **kwargs)
+
+    def batch_write(
+        self,
+        batch_size: int = 1000,
+        *,
+        ordered: bool = True,
+        concurrency: int = 1,
+        linger: float | None = None,
+        max_retries: int = 3,
+        on_error: Callable[[list[FailedOperation]], typing.Any] | None = None,
+        callback: Callable[[Exception | None], typing.Any] | None = None
+    ) -> MongoQueue:
         """
         Improve database writing performance by automatically spliting write requests into batches.
+        Set concurrency to keep several batches in flight at once, and linger to flush partial batches after a delay.
+        """
+        return MongoQueue(
+            self,
+            registry = getattr(self.database.client, "queue_registry", None),
+            size = batch_size,
+            ordered = ordered,
+            concurrency = concurrency,
+            linger = linger,
+            max_retries = max_retries,
+            on_error = on_error,
+            callback = callback
+        )
+
+    async def find_duplicates(self, spec: dict, limit: int = 5) -> list[dict]:
+        """Return up to limit key values that appear more than once for the keys of an index document."""
+        fields = list(spec["key"])
+        pipeline = []
+        if "partialFilterExpression" in spec:
+            pipeline.append({"$match": spec["partialFilterExpression"]})
+        pipeline.extend([
+            {
+                "$group": {
+                    "_id": {f"k{i}": f"${field}" for i, field in enumerate(fields)},
+                    "count": {"$sum": 1}
+                }
+            },
+            {
+                "$match": {
+                    "count": {"$gt": 1}
+                }
+            },
+            {
+                "$limit": limit
+            }
+        ])
+        docs = await self.aggregate(pipeline, allowDiskUse = True).to_list(None)
+        return [{**{field: doc["_id"].get(f"k{i}") for i, field in enumerate(fields)}, "count": doc["count"]} for doc in docs]
+
+    async def reconcile_indexes(self, indexes: Sequence[IndexModel]) -> list[str]:
+        """
+        Create declared indexes that don't exist yet and return their names.
+        Indexes whose unique option changed are dropped and rebuilt, after checking the existing documents \
+        don't break the new constraint. If they do, the old index is kept and DuplicateKeyError is raised \
+        once everything else has been created.
+        Other differences and undeclared indexes are only logged, never dropped.
+        """
+        existing = await self.index_information()
+        missing = []
+        conflicts = []
+        declared = set()
+        for model in indexes:
+            spec = model.document
+            name = spec["name"]
+            declared.add(name)
+            info = existing.get(name)
+            if info is None:
+                missing.append(model)
+            elif drift := index_drift(spec, info):
+                if "unique" in drift:
+                    if spec.get("unique"):
+                        duplicates = await self.find_duplicates(spec)
+                        if duplicates:
+                            conflicts.append(f"{name} has duplicate keys {duplicates}")
+                            continue
+                    log.warning(f"Rebuilding index {name} on {self.namespace}: {', '.join(drift)} changed")
+                    await self.drop_index(name)
+                    missing.append(model)
+                else:
+                    log.warning(f"Index {name} on {self.namespace} differs from declaration: {', '.join(drift)}")
+
+        for name in existing.keys() - declared - {"_id_"}:
+            log.warning(f"Undeclared index {name} on {self.namespace}")
+
+        created = await self.create_indexes(missing) if missing else []
+        if conflicts:
+            raise DuplicateKeyError(f"Can't make indexes on {self.namespace} unique: {'; '.join(conflicts)}")
+        return created
+
+    async def replace_all(
+        self,
+        documents: Iterable[dict] | AsyncIterable[dict],
+        *,
+        batch_size: int = 1000,
+        indexes: Sequence[IndexModel] = (),
+        hash_field: str | None = None,
+        check: Callable[[int], typing.Any] | None = None
+    ) -> int:
         """
-        return MongoQueue(self, size = batch_size, ordered = ordered, callback = callback)
+        Replace all documents of this collection.
+        New documents are bulk-inserted into a staging collection, indexed, then renamed over this one, \
+        so readers see either the old dataset or the new one and never anything in between.
+        If hash_field is set, content hashes are stored alongside for later sync.
+        If check is set, it's called with the number of staged documents right before the swap, \
+        and raising from it drops the staging collection and leaves this one untouched.
+        """
+        staging = self.database[f"{self.name}_staging_{ObjectId()}"]
+        queue = staging.batch_write(batch_size, concurrency = 4)
+        count = 0
+        try:
+            # created upfront, inserts and index builds would create it implicitly but there may be neither
+            await self.database.create_collection(staging.name)
+            async for doc in utils.async_iter(documents):
+                if hash_field:
+                    doc = {**doc, hash_field: content_hash(doc, exclude = ("_id", hash_field))}
+                await queue.write(InsertOne(doc))
+                count += 1
+            await queue.close()
+            if check is not None:
+                check(count)
+            if indexes:
+                await staging.create_indexes(list(indexes))
+            await staging.rename(self.name, dropTarget = True)
+        except:
+            await queue.cancel()
+            await staging.drop()
+            raise
+        finally:
+            await self.invalidate_cache()
+
+        return count
+
+    async def sync(
+        self,
+        documents: Iterable[dict] | AsyncIterable[dict],
+        *,
+        key: Sequence[str],
+        hash_field: str = "_hash",
+        check: Callable[[int], typing.Any] | None = None
+    ) -> SyncResult:
+        """
+        Make this collection match the given documents with as few writes as possible.
+        Documents are matched by key fields and compared by stored content hashes, \
+        then only the needed inserts, replaces and deletes are sent in a single bulk write.
+        If check is set, it's called with the number of documents before anything is written, raising from it aborts the sync.
+        """
+        stored: dict[tuple, tuple[ObjectId, str | None]] = {}
+        async for doc in self.find({}, {k: 1 for k in (*key, hash_field)}):
+            stored[tuple(doc.get(k) for k in key)] = (doc["_id"], doc.get(hash_field))
+
+        result = SyncResult()
+        requests = []
+        seen = set()
+        async for doc in utils.async_iter(documents):
+            doc_key = tuple(doc.get(k) for k in key)
+            if doc_key in seen:
+                raise ValueError(f"Duplicate document key: {doc_key}")
+            seen.add(doc_key)
+
+            new_hash = content_hash(doc, exclude = ("_id", hash_field))
+            doc = {k: v for k, v in doc.items() if k != "_id"}
+            doc[hash_field] = new_hash
+            try:
+                _id, old_hash = stored.pop(doc_key)
+            except KeyError:
+                requests.append(InsertOne(doc))
+                result.inserted.append(doc_key)
+            else:
+                if old_hash == new_hash:
+                    result.unchanged += 1
+                else:
+                    requests.append(ReplaceOne({"_id": _id}, doc))
+                    result.updated.append(doc_key)
+
+        if check is not None:
+            check(len(seen))
+
+        for doc_key, (_id, _) in stored.items():
+            requests.append(DeleteOne({"_id": _id}))
+            result.deleted.append(doc_key)
+
+        if requests:
+            await self.bulk_write(requests, ordered = False)
+
+        return result
 
 MotorDatabaseBase = typing.cast(type[AgnosticDatabase], AsyncIOMotorDatabase)
 class MongoDatabaseEX(MotorDatabaseBase):
@@ -81,6 +781,12 @@ class MongoDatabaseEX(MotorDatabaseBase):
 
 MotorClientBase = typing.cast(type[AgnosticClient], AsyncIOMotorClient)
 class MongoClientEX(MotorClientBase):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.queue_registry = MongoQueueRegistry()
+        self.shared_cache: SharedQueryCache | None = None
+        self.profiler = QueryProfiler()
+
     def __getattr__(self, name) -> MongoDatabaseEX:
         return super().__getattr__(name)
 
@@ -93,5 +799,8 @@ class MongoEX(BaseModel):
     client: MongoClientEX
     db: MongoDatabaseEX
 
+    async def drain_queues(self, timeout: float | None = None) -> int:
+        return await self.client.queue_registry.drain(timeout)
+
     class Config:
         arbitrary_types_allowed = True
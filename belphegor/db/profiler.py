@@ -0,0 +1,295 @@
+from collections import deque
+from collections.abc import Callable, Awaitable
+import asyncio
+import functools
+import bson
+import json
+import time
+import typing
+
+from belphegor import utils
+
+#=============================================================================================================================#
+
+log = utils.get_logger()
+
+#=============================================================================================================================#
+
+def query_shape(value: typing.Any) -> typing.Any:
+    """
+    Replace literal values of a filter or pipeline with "?", keeping operators, field names and field paths, \
+    so the same query with different arguments is grouped together.
+    """
+    if isinstance(value, dict):
+        return {k: query_shape(v) for k, v in value.items()}
+    elif isinstance(value, (list, tuple)):
+        if any(isinstance(v, (dict, list, tuple)) or (isinstance(v, str) and v.startswith("$")) for v in value):
+            return [query_shape(v) for v in value]
+        else:
+            return "?"
+    elif isinstance(value, str) and value.startswith("$"):
+        return value
+    else:
+        return "?"
+
+def shape_string(value: typing.Any) -> str:
+    if value is None:
+        return ""
+    return json.dumps(query_shape(value), separators = (",", ":"), ensure_ascii = False)
+
+def summarize_explain(explain: dict) -> dict[str, typing.Any]:
+    """Collect the winning plan stages and the examined counts from explain output of any server version."""
+    stages = []
+    docs_examined = 0
+    keys_examined = 0
+
+    def walk(node, in_plan: bool):
+        nonlocal docs_examined, keys_examined
+        if isinstance(node, dict):
+            for key, value in node.items():
+                if key == "stage" and in_plan and isinstance(value, str):
+                    if value not in stages:
+                        stages.append(value)
+                elif key == "totalDocsExamined":
+                    docs_examined += value
+                elif key == "totalKeysExamined":
+                    keys_examined += value
+                elif key in ("rejectedPlans", "allPlansExecution"):
+                    continue
+                walk(value, in_plan or key in ("winningPlan", "executionStages"))
+        elif isinstance(node, list):
+            for value in node:
+                walk(value, in_plan)
+
+    walk(explain, False)
+    return {
+        "stages": stages,
+        "collscan": "COLLSCAN" in stages,
+        "docs_examined": docs_examined,
+        "keys_examined": keys_examined
+    }
+
+#=============================================================================================================================#
+
+class OperationStats:
+    __slots__ = ("count", "total_time", "max_time", "docs", "bytes", "slow", "explain", "last_explained")
+
+    def __init__(self):
+        self.count = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.docs = 0
+        self.bytes = 0
+        self.slow = 0
+        self.explain: dict | None = None
+        self.last_explained = 0.0
+
+    def to_dict(self) -> dict[str, typing.Any]:
+        return {
+            "count": self.count,
+            "total_ms": self.total_time * 1000,
+            "avg_ms": self.total_time * 1000 / self.count if self.count else 0.0,
+            "max_ms": self.max_time * 1000,
+            "docs": self.docs,
+            "bytes": self.bytes,
+            "slow": self.slow,
+            "explain": self.explain
+        }
+
+class QueryProfiler:
+    """
+    Aggregated timing of database operations grouped by collection, operation and query shape. \
+    Operations slower than slow_threshold are logged, and explained in background at most once per explain_interval per shape.
+    With measure_bytes, returned documents are also encoded back to BSON to count their size, which costs about as much as decoding them.
+    """
+
+    def __init__(
+        self,
+        *,
+        slow_threshold: float = 0.2,
+        explain_interval: float = 600.0,
+        max_shapes: int = 1000,
+        enabled: bool = True,
+        measure_bytes: bool = False
+    ):
+        self.slow_threshold = slow_threshold
+        self.explain_interval = explain_interval
+        self.max_shapes = max_shapes
+        self.enabled = enabled
+        self.measure_bytes = measure_bytes
+        self.stats: dict[tuple[str, str, str], OperationStats] = {}
+        self.recent_slow: deque[dict[str, typing.Any]] = deque(maxlen = 50)
+        self._explaining: set[asyncio.Task] = set()
+
+    def record(
+        self,
+        namespace: str,
+        op: str,
+        shape: str,
+        duration: float,
+        *,
+        docs: int = 0,
+        nbytes: int = 0,
+        explain: Callable[[], Awaitable[dict]] | None = None
+    ):
+        key = (namespace, op, shape)
+        stats = self.stats.get(key)
+        if stats is None:
+            if len(self.stats) >= self.max_shapes:
+                key = (namespace, op, "(other)")
+                stats = self.stats.setdefault(key, OperationStats())
+            else:
+                stats = self.stats[key] = OperationStats()
+        stats.count += 1
+        stats.total_time += duration
+        stats.max_time = max(stats.max_time, duration)
+        stats.docs += docs
+        stats.bytes += nbytes
+
+        if duration >= self.slow_threshold:
+            stats.slow += 1
+            entry = {
+                "namespace": namespace,
+                "op": op,
+                "shape": shape,
+                "ms": duration * 1000,
+                "docs": docs,
+                "at": utils.now().isoformat()
+            }
+            self.recent_slow.append(entry)
+            current = time.monotonic()
+            if explain is not None and current - stats.last_explained >= self.explain_interval:
+                stats.last_explained = current
+                task = asyncio.create_task(self._explain(stats, entry, explain))
+                self._explaining.add(task)
+                task.add_done_callback(self._explaining.discard)
+            else:
+                log.warning(f"Slow {op} on {namespace}: {entry['ms']:.0f}ms, {docs} docs - {shape}")
+
+    async def _explain(self, stats: OperationStats, entry: dict, explain: Callable[[], Awaitable[dict]]):
+        try:
+            summary = summarize_explain(await explain())
+        except Exception as e:
+            log.warning(f"Slow {entry['op']} on {entry['namespace']}: {entry['ms']:.0f}ms, {entry['docs']} docs - {entry['shape']} (explain failed: {e!r})")
+        else:
+            stats.explain = entry["explain"] = summary
+            log.warning(
+                f"Slow {entry['op']} on {entry['namespace']}: {entry['ms']:.0f}ms, {entry['docs']} docs - {entry['shape']}\n"
+                f"Plan: {' > '.join(summary['stages'])}, examined {summary['docs_examined']} docs and {summary['keys_examined']} keys"
+            )
+
+    def top(self, n: int = 15, *, key: Callable[[OperationStats], float] = lambda s: s.total_time) -> list[tuple[tuple[str, str, str], OperationStats]]:
+        return sorted(self.stats.items(), key = lambda item: key(item[1]), reverse = True)[:n]
+
+    def to_dict(self) -> dict[str, typing.Any]:
+        return {
+            "operations": [
+                {
+                    "namespace": namespace,
+                    "op": op,
+                    "shape": shape,
+                    **stats.to_dict()
+                } for (namespace, op, shape), stats in self.top(len(self.stats))
+            ],
+            "recent_slow": list(self.recent_slow)
+        }
+
+    def reset(self):
+        self.stats.clear()
+        self.recent_slow.clear()
+
+#=============================================================================================================================#
+
+class ProfiledCursor:
+    """
+    Cursor wrapper timing only the time spent waiting for the database, not the consumer's work between documents. \
+    The operation is recorded once the cursor is exhausted, closed or failed.
+    """
+
+    def __init__(
+        self,
+        cursor,
+        profiler: QueryProfiler,
+        namespace: str,
+        op: str,
+        shape: str,
+        explain: Callable[[], Awaitable[dict]] | None = None
+    ):
+        self._cursor = cursor
+        self._profiler = profiler
+        self._namespace = namespace
+        self._op = op
+        self._shape = shape
+        self._explain = explain
+        self._elapsed = 0.0
+        self._docs = 0
+        self._bytes = 0
+        self._recorded = False
+
+    def __getattr__(self, name):
+        attr = getattr(self._cursor, name)
+        if not callable(attr):
+            return attr
+
+        # keep chained calls like sort and limit on the wrapper
+        @functools.wraps(attr)
+        def method(*args, **kwargs):
+            result = attr(*args, **kwargs)
+            return self if result is self._cursor else result
+
+        return method
+
+    def _count(self, docs: list[dict]):
+        self._docs += len(docs)
+        if self._profiler.measure_bytes:
+            self._bytes += sum(len(bson.encode(doc)) for doc in docs)
+
+    def _record(self):
+        if not self._recorded:
+            self._recorded = True
+            self._profiler.record(
+                self._namespace,
+                self._op,
+                self._shape,
+                self._elapsed,
+                docs = self._docs,
+                nbytes = self._bytes,
+                explain = self._explain
+            )
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> dict:
+        start = time.perf_counter()
+        finished = True
+        try:
+            doc = await self._cursor.next()
+            finished = False
+        finally:
+            self._elapsed += time.perf_counter() - start
+            # exhausted or failed midway
+            if finished:
+                self._record()
+        self._count([doc])
+        return doc
+
+    async def next(self) -> dict:
+        return await self.__anext__()
+
+    async def to_list(self, length: int | None = None) -> list[dict]:
+        start = time.perf_counter()
+        docs = None
+        try:
+            docs = await self._cursor.to_list(length)
+        finally:
+            self._elapsed += time.perf_counter() - start
+            if docs is not None:
+                self._count(docs)
+            if docs is None or length is None or len(docs) < length:
+                self._record()
+        return docs
+
+    async def close(self):
+        await self._cursor.close()
+        self._record()
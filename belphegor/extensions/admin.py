@@ -11,6 +11,7 @@ from contextlib import redirect_stdout
 import os
 import typing
 import enum
+import json
 
 from belphegor import utils
 from belphegor.settings import settings
@@ -81,6 +82,73 @@ class Admin(commands.Cog):
 
         await panel.reply(interaction)
 
+    @ac.command(name = "metrics")
+    @ac.describe(kind = "Metrics to show")
+    @ac.guilds(*settings.TEST_GUILDS)
+    @ac.check(checks.owner_only())
+    async def metrics(
+        self,
+        interaction: Interaction,
+        kind: typing.Literal["queries", "slow_queries", "views", "discord", "prometheus"] = "queries"
+    ):
+        panel = panels.ControlPanel()
+        await panel.thinking(interaction)
+        profiler = self.bot.mongo.client.profiler
+        data = profiler.to_dict()
+        match kind:
+            case "queries":
+                lines = [f"{'total ms':>9} {'count':>6} {'avg ms':>7} {'max ms':>7} {'docs':>7}  operation"]
+                for (namespace, op, shape), stats in profiler.top(10):
+                    lines.append(
+                        f"{stats.total_time * 1000:>9.0f} {stats.count:>6} {stats.total_time * 1000 / stats.count:>7.1f} "
+                        f"{stats.max_time * 1000:>7.1f} {stats.docs:>7}  {op} {namespace}"
+                    )
+                    if shape:
+                        lines.append(f"    {shape[:100]}")
+            case "slow_queries":
+                lines = []
+                for entry in reversed(profiler.recent_slow):
+                    plan = entry.get("explain")
+                    lines.append(f"{entry['ms']:>7.0f}ms {entry['docs']:>6} docs  {entry['op']} {entry['namespace']}")
+                    if plan:
+                        lines.append(f"    {' > '.join(plan['stages'])}, {plan['docs_examined']} docs examined")
+                data = data["recent_slow"]
+            case "views":
+                data = self.bot.view_registry.stats()
+                lines = [
+                    f"{data['views']}/{data['max_views']} live views, {data['bytes'] / 1024:.0f}/{data['max_bytes'] / 1024:.0f} KiB, {data['evictions']} evicted",
+                    f"{'views':>6} {'KiB':>8}  owner"
+                ]
+                for owner, stats in sorted(data["owners"].items(), key = lambda item: item[1]["bytes"], reverse = True):
+                    lines.append(f"{stats['views']:>6} {stats['bytes'] / 1024:>8.1f}  {owner}")
+            case "discord" | "prometheus":
+                registry = self.bot.metrics
+                data = registry.to_dict()
+                lines = []
+                for name, title in (("interaction_first_response_seconds", "command"), ("discord_http_request_seconds", "route")):
+                    series = sorted(registry.histograms.get(name, {}).items(), key = lambda item: item[1].count, reverse = True)
+                    if series:
+                        lines.append(f"{'count':>6} {'p50 ms':>7} {'p95 ms':>7} {'max ms':>7}  {title}")
+                        for labels, histogram in series[:10]:
+                            lines.append(
+                                f"{histogram.count:>6} {histogram.quantile(0.5) * 1000:>7.0f} {histogram.quantile(0.95) * 1000:>7.0f} "
+                                f"{histogram.max * 1000:>7.0f}  {' '.join(value for key, value in labels)}"
+                            )
+                        lines.append("")
+                for labels, count in registry.counters.get("discord_ratelimited_total", {}).items():
+                    lines.append(f"429 x{count:.0f}  {' '.join(value for key, value in labels)}")
+
+        text = "\n".join(lines) if lines else "Nothing recorded yet."
+        if kind == "prometheus":
+            file = File.from_str(self.bot.metrics.to_prometheus(), "metrics.prom")
+        else:
+            file = File.from_str(json.dumps(data, indent = 4, ensure_ascii = False, default = str), f"{kind}.json")
+        panel.edit_blueprint(
+            content = f"```\n{text[:1900]}\n```",
+            files = [file]
+        )
+        await panel.reply(interaction)
+
     @commands.command(name = "eval")
     @commands.is_owner()
     async def eval_(self, ctx, *, raw: str):
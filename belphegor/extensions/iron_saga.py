@@ -3,8 +3,13 @@ from discord import app_commands as ac
 from discord.ext import commands
 from pydantic import BaseModel, Field
 import typing
-from collections.abc import Callable
+from collections.abc import Callable, AsyncIterator
 from urllib.parse import quote
+from pymongo import UpdateOne, IndexModel
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import asyncio
+import os
 import json
 import time
 import traceback
@@ -12,9 +17,10 @@ import math
 import re
 
 from belphegor import errors, utils
+from belphegor.db import IngestCheckpoint, ValidatedJSONStream, MongoQueue
 from belphegor.settings import settings
-from belphegor.utils import wiki
-from belphegor.templates import ui_ex, paginators, queries, checks
+from belphegor.utils import wiki, crawler
+from belphegor.templates import ui_ex, paginators, panels, queries, checks, persistent, auto_defer
 from belphegor.templates.discord_types import Interaction, File
 
 if typing.TYPE_CHECKING:
@@ -184,6 +190,13 @@ class PilotCopilotSlots(BaseModel):
     Control: bool
     Special: bool
 
+PILOT_INDEXES = [
+    IndexModel("index", unique = True),
+    IndexModel("en_name"),
+    IndexModel("aliases"),
+    IndexModel("skills.name")
+]
+
 class Pilot(BaseModel):
     index: int
     en_name: str = Field(..., min_length = 1)
@@ -305,8 +318,8 @@ class PilotSelector(paginators.SingleRowPaginator):
         paginator.pilots = {p.en_name: p for p in pilots}
         return paginator
 
-    def render_embed(self):
-        embed = super().render_embed()
+    def build_page_embed(self, index: int):
+        embed = super().build_page_embed(index)
         embed.title = f"Found {len(self.pilots)} pilots"
         return embed
 
@@ -319,7 +332,7 @@ class PilotStatsButton(ui_ex.StatsButton):
 
     async def callback(self, interaction: Interaction):
         paginator = self.paginator
-        paginator.edit_blueprint(embed = paginator.pilot.stats_embed())
+        paginator.show_tab("stats")
         await paginator.update(interaction)
 
 class PilotAwakenStatsButton(ui_ex.StatsButton):
@@ -330,7 +343,7 @@ class PilotAwakenStatsButton(ui_ex.StatsButton):
 
     async def callback(self, interaction: Interaction):
         paginator = self.paginator
-        paginator.edit_blueprint(embed = paginator.pilot.awaken_stats_embed())
+        paginator.show_tab("awaken")
         await paginator.update(interaction)
 
 class PilotTriviaButton(ui_ex.TriviaButton):
@@ -338,7 +351,7 @@ class PilotTriviaButton(ui_ex.TriviaButton):
 
     async def callback(self, interaction: Interaction):
         paginator = self.paginator
-        paginator.edit_blueprint(embed = paginator.pilot.trivia_embed())
+        paginator.show_tab("trivia")
         await paginator.update(interaction)
 
 class PilotSkinsButton(ui_ex.SkinsButton):
@@ -347,7 +360,6 @@ class PilotSkinsButton(ui_ex.SkinsButton):
     async def callback(self, interaction: Interaction):
         paginator = self.paginator
         paginator.show_next_skin_set()
-        self.label = f"Skins ({paginator.skins.current_index + 1} / {len(paginator.skins)})"
         await paginator.update(interaction)
 
 class PilotSkinSelect(ui_ex.SelectOne):
@@ -362,9 +374,22 @@ class PilotSkinSelect(ui_ex.SelectOne):
         await paginator.update(interaction)
 
 class PilotDisplay(paginators.BasePaginator):
+    """
+    Pilot info panel. It's persistent: the pilot index, tab and skin are encoded in the custom_id of each component \
+    as the state that component leads to, and IronSaga.route_pilot rebuilds the panel from that.
+    """
+
     SKIN_SELECT_SIZE = 20
+    TABS = {
+        "stats": "stats_embed",
+        "awaken": "awaken_stats_embed",
+        "trivia": "trivia_embed"
+    }
+
+    persistent = True
 
     pilot: Pilot
+    tab: str
     skins: utils.CircleIter[utils.CircleIter[PilotSkin]]
 
     stats_button: PilotStatsButton
@@ -373,21 +398,33 @@ class PilotDisplay(paginators.BasePaginator):
     skin_button: PilotSkinsButton
     skin_select: PilotSkinSelect
 
-    def __init__(self, pilot: Pilot):
+    def __init__(self, pilot: Pilot, *, tab: str = "stats", skin_set: int = 0, skin: int = 0):
         self.pilot = pilot
-        self.skins = utils.CircleIter([utils.CircleIter(s, start_index = 0) for s in utils.grouper(pilot.skins, self.SKIN_SELECT_SIZE, incomplete = "missing")], start_index = -1)
+        self.skins = utils.CircleIter([utils.CircleIter(s, start_index = 0) for s in utils.grouper(pilot.skins, self.SKIN_SELECT_SIZE, incomplete = "missing")], start_index = skin_set - 1)
 
         view = self.view = ui_ex.View()
-        view.add_item(self.get_paginator_attribute("stats_button", row = 1))
+        self.stats_button = self.get_paginator_attribute("stats_button", row = 1)
+        view.add_item(self.stats_button)
         if pilot.awaken_skills:
-            view.add_item(self.get_paginator_attribute("awaken_button", row = 1))
-        view.add_item(self.get_paginator_attribute("trivia_button", row = 1))
+            self.awaken_button = self.get_paginator_attribute("awaken_button", row = 1)
+            view.add_item(self.awaken_button)
+        self.trivia_button = self.get_paginator_attribute("trivia_button", row = 1)
+        view.add_item(self.trivia_button)
         if len(self.skins) > 1:
-            view.add_item(self.get_paginator_attribute("skin_button", row = 1, label = f"Skins (1 / {len(self.skins)})"))
-        view.add_exit_button(row = 2)
+            self.skin_button = self.get_paginator_attribute("skin_button", row = 1)
+            view.add_item(self.skin_button)
+        if self.persistent:
+            view.add_item(ui_ex.ExitButton(row = 2, custom_id = persistent.encode_custom_id("exit")))
+        else:
+            view.add_exit_button(row = 2)
 
         self.show_next_skin_set()
-        self.edit_blueprint(embed = pilot.stats_embed())
+        self.skins.current().jump_to(skin)
+        self.show_tab(tab)
+
+    def show_tab(self, tab: str):
+        self.tab = tab
+        self.edit_blueprint(embed = getattr(self.pilot, self.TABS[tab])())
 
     def show_next_skin_set(self):
         if getattr(self, "skin_select", None):
@@ -405,10 +442,26 @@ class PilotDisplay(paginators.BasePaginator):
         self.skin_select = skin_select
         self.view.add_item(skin_select)
 
+    def state_custom_id(self, *state: typing.Any) -> str:
+        return persistent.encode_custom_id("pilot", self.pilot.index, *state)
+
     def render(self):
-        skin = self.skins.current().current()
+        set_index, batch = self.skins.current(True)
+        skin = batch.current()
         self.skin_select.placeholder = skin.name
         self.blueprint.embed.set_image(url = skin.url)
+        if getattr(self, "skin_button", None):
+            self.skin_button.label = f"Skins ({set_index + 1} / {len(self.skins)})"
+
+        if self.persistent:
+            self.stats_button.custom_id = self.state_custom_id("stats", set_index, batch.current_index)
+            if getattr(self, "awaken_button", None):
+                self.awaken_button.custom_id = self.state_custom_id("awaken", set_index, batch.current_index)
+            self.trivia_button.custom_id = self.state_custom_id("trivia", set_index, batch.current_index)
+            if getattr(self, "skin_button", None):
+                self.skin_button.custom_id = self.state_custom_id(self.tab, (set_index + 1) % len(self.skins), 0)
+            # the selected skin comes from the select values
+            self.skin_select.custom_id = self.state_custom_id(self.tab, set_index)
         return self
 
 #=============================================================================================================================#
@@ -421,14 +474,13 @@ class SkillEmbedTemplate(paginators.PaginatorEmbedTemplate):
         False
     )
 
-class SkillPaginator(PilotSelector):
+class SkillPaginator(paginators.WindowedPaginator[PilotReducedSkills]):
     embed_template: SkillEmbedTemplate
 
-    @classmethod
-    def from_pilots(cls, pilots: list[PilotReducedSkills]):
-        paginator = cls([paginators.PageItem(value = p) for p in pilots], page_size = 5, selectable = False)
-        paginator.pilots = {p.en_name: p for p in pilots}
-        return paginator
+    def build_page_embed(self, index: int):
+        embed = super().build_page_embed(index)
+        embed.title = f"Found {self.item_count} pilots"
+        return embed
 
 #=============================================================================================================================#
 
@@ -439,6 +491,12 @@ COLOR_MAPPING = {
     "C": discord.Color.light_grey()
 }
 
+PART_INDEXES = [
+    IndexModel([("rank", 1), ("name", 1)], unique = True),
+    IndexModel("name"),
+    IndexModel("aliases")
+]
+
 class Part(BaseModel):
     name: str
     classification: typing.Literal["core", "shell", "support", "armour", "coating"]
@@ -491,13 +549,18 @@ class PartSelector(paginators.SingleRowPaginator):
         paginator.parts = {f"{p.rank}_{p.name}": p for p in parts}
         return paginator
 
-    def render_embed(self):
-        embed = super().render_embed()
+    def build_page_embed(self, index: int):
+        embed = super().build_page_embed(index)
         embed.title = f"Found {len(self.parts)} parts"
         return embed
 
 #=============================================================================================================================#
 
+PET_INDEXES = [
+    IndexModel("name"),
+    IndexModel("aliases")
+]
+
 class Pet(BaseModel):
     name: str
     effect: str
@@ -537,16 +600,274 @@ class PetSelector(paginators.SingleRowPaginator):
         paginator.pets = {p.name: p for p in pets}
         return paginator
 
-    def render_embed(self):
-        embed = super().render_embed()
+    def build_page_embed(self, index: int):
+        embed = super().build_page_embed(index)
         embed.title = f"Found {len(self.pets)} pets"
         return embed
 
 #=============================================================================================================================#
 
+JSON_MODELS: dict[str, type[BaseModel]] = {
+    "parts": Part,
+    "pets": Pet
+}
+
+SYNC_KEYS: dict[str, tuple[str, ...]] = {
+    "parts": ("rank", "name"),
+    "pets": ("name",)
+}
+
+# attachments bigger than this are validated in a worker thread
+OFFLOAD_SIZE = 1 << 20
+# uploads with more invalid entries than this are rejected as a whole rather than dropping the rest of the collection
+MAX_INVALID_RATIO = 0.1
+
+WIKITEXT_INDEXES = [
+    IndexModel("page_id", unique = True),
+    IndexModel("kind")
+]
+
+INGEST_JOB_INDEXES = [
+    IndexModel([("kind", 1), ("created_at", -1)])
+]
+
+#=============================================================================================================================#
+
+def parse_skill_list(wikitext: str) -> dict[str, dict[str, str]]:
+    data = parser.parse(wikitext)
+    result = {}
+    for row in data[0][1:]:
+        m0 = skill_section_regex.match(row[0])
+        m2 = skill_section_regex.match(row[2])
+        result[m0.group(1)] = {
+            "name": m0.group(3),
+            "effect": m2.group(3)
+        }
+    return result
+
+def parse_pilot_list(wikitext: str) -> list[str]:
+    data = parser.parse(wikitext)
+    names = []
+    for row in data[0][1:]:
+        if len(row) > 1:
+            names.append(parser.parse(row[0]))
+    return names
+
+def parse_pilot(title: str, page_id: int, wikitext: str) -> Pilot:
+    ret = parser.parse(wikitext)
+    skins: dict[str, PilotSkin] = {}
+    for item in ret:
+        if isinstance(item, dict):
+            skin_galleries = []
+
+            if "pilot_info" in item or "pilot_info_v2" in item:
+                try:
+                    basic_info = item["pilot_info"]
+                    v2 = False
+                except KeyError:
+                    basic_info = item["pilot_info_v2"]
+                    v2 = True
+
+                elem = basic_info["image"]
+                try:
+                    tabber = elem[0]["tabber"]
+                except KeyError:
+                    filename = elem[0]["file"]
+                    skins.setdefault(filename, PilotSkin.from_filename(filename))
+                except TypeError:
+                    filename = elem.strip()
+                    skins.setdefault(filename, PilotSkin.from_filename(filename))
+                else:
+                    for tab in tabber:
+                        if isinstance(tab, dict):
+                            filename = tab["file"]
+                            skins.setdefault(filename, PilotSkin.from_filename(filename))
+
+                for elem in basic_info.get("skins", []):
+                    if isinstance(elem, dict):
+                        if "skin_gallery" in elem:
+                            skin_galleries.append(elem)
+
+            if "skin_gallery" in item:
+                skin_galleries.append(item)
+
+            for sg in skin_galleries:
+                for s in sg["skin_gallery"]:
+                    filename, _, name = s.partition("|")
+                    if filename.startswith("File:"):
+                        filename = filename[5:]
+                    skins.setdefault(filename, PilotSkin.from_filename(filename))
+
+    if v2:
+        pilot = Pilot(
+            index = page_id,
+            en_name = basic_info["name (english/romaji)"],
+            jp_name = basic_info["name (original)"],
+            page_name = title,
+            description = basic_info.get("background"),
+            personality = basic_info["personality"],
+            faction = basic_info["affiliation"],
+            artist = basic_info.get("artist"),
+            voice_actor = basic_info.get("seiyuu"),
+            stats = PilotStats(
+                ranged_growth = basic_info["rangedgrowth"],
+                melee_growth = basic_info["meleegrowth"],
+                defense_growth = basic_info["defensegrowth"],
+                reaction_growth = basic_info["reactiongrowth"],
+            ),
+            skills = (
+                PilotSkill(
+                    name = skills[basic_info["activeskill"]]["name"],
+                    effect = skills[basic_info["activeskill"]]["effect"],
+                    copilot = COPILOT_SLOTS.get(basic_info.get("activeskillcopilot", "").lower())
+                ),
+                PilotSkill(
+                    name = skills[basic_info["passiveskill1"]]["name"],
+                    effect = skills[basic_info["passiveskill1"]]["effect"],
+                    copilot = COPILOT_SLOTS.get(basic_info.get("passiveskill1copilot", "").lower())
+                ),
+                PilotSkill(
+                    name = skills[basic_info["passiveskill2"]]["name"],
+                    effect = skills[basic_info["passiveskill2"]]["effect"],
+                    copilot = COPILOT_SLOTS.get(basic_info.get("passiveskill2copilot", "").lower())
+                ),
+                PilotSkill(
+                    name = skills[basic_info["passiveskill3"]]["name"],
+                    effect = skills[basic_info["passiveskill3"]]["effect"],
+                    copilot = COPILOT_SLOTS.get(basic_info.get("passiveskill3copilot", "").lower())
+                )
+            ),
+            awaken_skills = (
+                PilotSkill(
+                    name = skills[basic_info["awakenactiveskill"]]["name"],
+                    effect = skills[basic_info["awakenactiveskill"]]["effect"],
+                    copilot = COPILOT_SLOTS.get(basic_info.get("awakenactiveskillcopilot", "").lower())
+                ),
+                PilotSkill(
+                    name = skills[basic_info["awakenpassiveskill1"]]["name"],
+                    effect = skills[basic_info["awakenpassiveskill1"]]["effect"],
+                    copilot = COPILOT_SLOTS.get(basic_info.get("awakenpassiveskill1copilot", "").lower())
+                ),
+                PilotSkill(
+                    name = skills[basic_info["awakenpassiveskill2"]]["name"],
+                    effect = skills[basic_info["awakenpassiveskill2"]]["effect"],
+                    copilot = COPILOT_SLOTS.get(basic_info.get("awakenpassiveskill2copilot", "").lower())
+                ),
+                PilotSkill(
+                    name = skills[basic_info["awakenpassiveskill3"]]["name"],
+                    effect = skills[basic_info["awakenpassiveskill3"]]["effect"],
+                    copilot = COPILOT_SLOTS.get(basic_info.get("awakenpassiveskill3copilot", "").lower())
+                )
+            ) if "awakenactiveskill" in basic_info else (),
+            copilot_slots = PilotCopilotSlots(
+                Attack = bool(basic_info.get("copilotattack")),
+                Tech = bool(basic_info.get("copilottech")),
+                Defense = bool(basic_info.get("copilotdefense")),
+                Support = bool(basic_info.get("copilotsupport")),
+                Control = bool(basic_info.get("copilotcontrol")),
+                Special = bool(basic_info.get("copilotspecial"))
+            ),
+            skins = list(skins.values())
+        )
+    else:
+        pilot = Pilot(
+            index = page_id,
+            en_name = basic_info["name (english/romaji)"],
+            jp_name = basic_info["name (original)"],
+            page_name = title,
+            description = basic_info.get("background"),
+            personality = basic_info["personality"],
+            faction = basic_info["affiliation"],
+            artist = basic_info.get("artist"),
+            voice_actor = basic_info.get("seiyuu"),
+            stats = PilotStats.estimated_from_stats(
+                ranged = utils.to_int(basic_info["shootingmax"]),
+                melee = utils.to_int(basic_info["meleemax"]),
+                defense = utils.to_int(basic_info["defensemax"]),
+                reaction = utils.to_int(basic_info["reactionmax"])
+            ),
+            skills = (
+                PilotSkill(
+                    name = basic_info["activeskillname"],
+                    effect = basic_info["activeskilleffect"],
+                    copilot = COPILOT_SLOTS.get(basic_info.get("activeskilltype", "").lower())
+                ),
+                PilotSkill(
+                    name = basic_info["passiveskill1name"],
+                    effect = basic_info["passiveskill1effect"],
+                    copilot = COPILOT_SLOTS.get(basic_info.get("passiveskill1type", "").lower())
+                ),
+                PilotSkill(
+                    name = basic_info["passiveskill2name"],
+                    effect = basic_info["passiveskill2effect"],
+                    copilot = COPILOT_SLOTS.get(basic_info.get("passiveskill2type", "").lower())
+                ),
+                PilotSkill(
+                    name = basic_info["passiveskill3name"],
+                    effect = basic_info["passiveskill3effect"],
+                    copilot = COPILOT_SLOTS.get(basic_info.get("passiveskill3type", "").lower())
+                )
+            ),
+            copilot_slots = PilotCopilotSlots(
+                Attack = bool(basic_info.get("copilotattack")),
+                Tech = bool(basic_info.get("copilottech")),
+                Defense = bool(basic_info.get("copilotdefense")),
+                Support = bool(basic_info.get("copilotsupport")),
+                Control = bool(basic_info.get("copilotcontrol")),
+                Special = bool(basic_info.get("copilotspecial"))
+            ),
+            skins = list(skins.values())
+        )
+
+    return pilot
+
+def pilot_upsert(pilot: dict) -> UpdateOne:
+    return UpdateOne(
+        {
+            "index": pilot["index"]
+        },
+        {
+            "$set": pilot,
+            "$setOnInsert": {
+                "aliases": []
+            }
+        },
+        upsert = True
+    )
+
+def _init_reparse_worker(skill_data: dict[str, dict[str, str]]):
+    skills.clear()
+    skills.update(skill_data)
+
+def _reparse_snapshot(title: str, page_id: int, data: bytes) -> tuple[str, dict | None, str | None]:
+    try:
+        pilot = parse_pilot(title, page_id, wiki.decompress_wikitext(data))
+    except:
+        return title, None, traceback.format_exc()
+    else:
+        return title, pilot.model_dump(), None
+
+#=============================================================================================================================#
+
 class IronSaga(commands.Cog):
+    db_indexes = {
+        "iron_saga_pilots": PILOT_INDEXES,
+        "iron_saga_parts": PART_INDEXES,
+        "iron_saga_pets": PET_INDEXES,
+        "iron_saga_wikitext": WIKITEXT_INDEXES,
+        "iron_saga_ingest_jobs": INGEST_JOB_INDEXES
+    }
+
     def __init__(self, bot: "Belphegor"):
         self.bot = bot
+        self.crawler = crawler.CrawlerClient(bot.session)
+        self.pilots = bot.mongo.db.iron_saga_pilots.with_cache()
+        self.parts = bot.mongo.db.iron_saga_parts.with_cache()
+        self.pets = bot.mongo.db.iron_saga_pets.with_cache()
+        self.json_collections = {
+            "parts": self.parts,
+            "pets": self.pets
+        }
 
         self.update_parts_ctx_menu = ac.ContextMenu(
             name = 'Update IS parts',
@@ -560,16 +881,45 @@ class IronSaga(commands.Cog):
         )
         bot.tree.add_command(self.update_parts_ctx_menu)
         bot.tree.add_command(self.update_pets_ctx_menu)
+        bot.persistent_router.add_route("pilot", self.route_pilot)
 
     async def cog_unload(self):
         self.bot.tree.remove_command(self.update_parts_ctx_menu.name, type = self.update_parts_ctx_menu.type)
         self.bot.tree.remove_command(self.update_pets_ctx_menu.name, type = self.update_pets_ctx_menu.type)
+        self.bot.persistent_router.remove_route("pilot")
+
+    async def route_pilot(self, interaction: Interaction, index: str, tab: str, skin_set: str, skin: str | None = None):
+        if skin is None:
+            skin = interaction.data["values"][0]
+        pilots = await self.pilots.bind(Pilot).cached_aggregate([
+            {
+                "$match": {
+                    "index": int(index)
+                }
+            }
+        ])
+        if not pilots:
+            return await panels.ControlPanel.from_parts(content = "This pilot doesn't exist anymore.", ephemeral = True).reply(interaction)
+
+        pilot = pilots[0]
+        skin_set = int(skin_set)
+        skin = int(skin)
+        # skins and awaken skills may have changed since the message was sent
+        set_amount = math.ceil(len(pilot.skins) / PilotDisplay.SKIN_SELECT_SIZE)
+        if not 0 <= skin_set < set_amount:
+            skin_set = skin = 0
+        elif not 0 <= skin < min(PilotDisplay.SKIN_SELECT_SIZE, len(pilot.skins) - skin_set * PilotDisplay.SKIN_SELECT_SIZE):
+            skin = 0
+        if tab not in PilotDisplay.TABS or (tab == "awaken" and not pilot.awaken_skills):
+            tab = "stats"
+        paginator = PilotDisplay(pilot, tab = tab, skin_set = skin_set, skin = skin)
+        paginator.target_message = interaction.message
+        await paginator.update(interaction)
 
     @ac.command(name = "pilot")
     @ac.describe(name = "Pilot name")
     async def get_pilot(self, interaction: Interaction, name: str):
-        pilots = []
-        async for doc in self.bot.mongo.db.iron_saga_pilots.aggregate([
+        pilots = await self.pilots.bind(Pilot).cached_aggregate([
             {
                 "$match": queries.match_any(name, ("en_name", "jp_name", "aliases"))
             },
@@ -577,17 +927,11 @@ class IronSaga(commands.Cog):
                 "$sort": {
                     "en_name": 1
                 }
-            },
-            {
-                "$project": {
-                    "_id": 0
-                }
             }
-        ]):
-            pilots.append(Pilot(**doc))
+        ])
 
         if len(pilots) == 0:
-            return await interaction.response.send_message(f"Can't find any pilot with name: {name}")
+            return await panels.ControlPanel.from_parts(content = f"Can't find any pilot with name: {name}").reply(interaction)
 
         if len(pilots) > 1:
             paginator = PilotSelector.from_pilots(pilots)
@@ -599,45 +943,48 @@ class IronSaga(commands.Cog):
     @ac.command(name = "skill")
     @ac.describe(name = "Skill name")
     async def skill(self, interaction: Interaction, name: str):
-        pilots = []
-        async for doc in self.bot.mongo.db.iron_saga_pilots.aggregate([
-            {
-                "$match": {
-                    "skills": {
-                        "$elemMatch": queries.match_any(name, ["name", "effect"])
-                    }
-                }
-            },
-            {
-                "$sort": {
-                    "en_name": 1
+        match = {
+            "$match": {
+                "skills": {
+                    "$elemMatch": queries.match_any(name, ["name", "effect"])
                 }
-            },
-            {
-                "$addFields": {
-                    "_id": "$$REMOVE",
-                    "skills": {
-                        "$filter": {
-                            "input": "$skills",
-                            "cond": queries.aggregate_match_any(name, ["$$this.name", "$$this.effect"])
+            }
+        }
+        source = paginators.MongoPageSource(
+            self.pilots,
+            [
+                match,
+                {
+                    "$sort": {
+                        "en_name": 1
+                    }
+                },
+                {
+                    "$addFields": {
+                        "skills": {
+                            "$filter": {
+                                "input": "$skills",
+                                "cond": queries.aggregate_match_any(name, ["$$this.name", "$$this.effect"])
+                            }
                         }
                     }
                 }
-            }
-        ]):
-            pilots.append(PilotReducedSkills(**doc))
+            ],
+            model = PilotReducedSkills,
+            count_pipeline = [match]
+        )
+        paginator = SkillPaginator(source, page_size = 5)
+        await paginator.load()
 
-        if pilots:
-            paginator = SkillPaginator.from_pilots(pilots)
+        if paginator.item_count:
             await paginator.initialize(interaction)
         else:
-            return await interaction.response.send_message(f"Can't find any skill with name: {name}")
+            return await panels.ControlPanel.from_parts(content = f"Can't find any skill with name: {name}").reply(interaction)
 
     @ac.command(name = "part")
     @ac.describe(name = "Part name")
     async def get_part(self, interaction: Interaction, name: str):
-        parts = []
-        async for doc in self.bot.mongo.db.iron_saga_parts.aggregate([
+        parts = await self.parts.bind(Part).cached_aggregate([
             {
                 "$match": queries.match_any(name, ("name", "aliases"))
             },
@@ -656,30 +1003,22 @@ class IronSaga(commands.Cog):
                     "_rank_index": 1,
                     "name": 1
                 }
-            },
-            {
-                "$addFields": {
-                    "_id": "$$REMOVE",
-                    "_rank_index": "$$REMOVE"
-                }
             }
-        ]):
-            parts.append(Part(**doc))
+        ])
 
         if len(parts) == 0:
-            return await interaction.response.send_message(f"Can't find any part with name: {name}")
+            return await panels.ControlPanel.from_parts(content = f"Can't find any part with name: {name}").reply(interaction)
 
         if len(parts) > 1:
             paginator = PartSelector.from_parts(parts)
             await paginator.initialize(interaction)
         else:
-            await interaction.response.send_message(embed = parts[0].display())
+            await panels.ControlPanel.from_parts(embed = parts[0].display()).reply(interaction)
 
     @ac.command(name = "pet")
     @ac.describe(name = "Pet name")
     async def get_pet(self, interaction: Interaction, name: str):
-        pets = []
-        async for doc in self.bot.mongo.db.iron_saga_pets.aggregate([
+        pets = await self.pets.bind(Pet).cached_aggregate([
             {
                 "$match": queries.match_any(name, ("name", "aliases"))
             },
@@ -687,324 +1026,298 @@ class IronSaga(commands.Cog):
                 "$sort": {
                     "name": 1
                 }
-            },
-            {
-                "$addFields": {
-                    "_id": "$$REMOVE"
-                }
             }
-        ]):
-            pets.append(Pet(**doc))
+        ])
 
         if len(pets) == 0:
-            return await interaction.response.send_message(f"Can't find any pet with name: {name}")
+            return await panels.ControlPanel.from_parts(content = f"Can't find any pet with name: {name}").reply(interaction)
 
         if len(pets) > 1:
             paginator = PetSelector.from_pets(pets)
             await paginator.initialize(interaction)
         else:
-            await interaction.response.send_message(embed = pets[0].display())
+            await panels.ControlPanel.from_parts(embed = pets[0].display()).reply(interaction)
 
     @ac.command(name = "update_pilot")
+    @ac.describe(
+        name = "Pilot names separated by semicolon, default to all pilots, new jobs only",
+        mode = "Start a new job, resume the last unfinished one, or retry failed names of the last one"
+    )
     @ac.guilds(*settings.TEST_GUILDS)
     @ac.check(checks.owner_only())
-    async def update_pilot(self, interaction: Interaction, name: typing.Optional[str] = None):
-        await interaction.response.defer(thinking = True)
+    async def update_pilot(
+        self,
+        interaction: Interaction,
+        name: typing.Optional[str] = None,
+        mode: typing.Literal["new", "resume", "retry_failed"] = "new"
+    ):
+        await auto_defer.defer(interaction, thinking = True)
+        if name is not None and mode != "new":
+            return await interaction.followup.send("Names can only be given when starting a new job.")
 
         # fetch all skills
-        resp = await self.bot.session.get(
-            ISWIKI_API,
-            params = {
-                "action":       "parse",
-                "prop":         "wikitext",
-                "page":         "Skill_List",
-                "format":       "json",
-                "redirects":    1
-            }
-        )
-        raw = json.loads(await resp.content.read())
-        data = parser.parse(raw["parse"]["wikitext"]["*"])
-        for row in data[0][1:]:
-            m0 = skill_section_regex.match(row[0])
-            m2 = skill_section_regex.match(row[2])
-            skills[m0.group(1)] = {
-                "name": m0.group(3),
-                "effect": m2.group(3)
-            }
-
-        # pilot parsing
-        if name is None:
-            params = {
-                "action":       "parse",
-                "prop":         "wikitext",
-                "page":         "Pilot_List",
-                "format":       "json",
-                "redirects":    1
-            }
-            resp = await self.bot.session.get(ISWIKI_API, params = params)
-            raw = json.loads(await resp.content.read())
-            data = parser.parse(raw["parse"]["wikitext"]["*"])
-            names = []
-            for row in data[0][1:]:
-                if len(row) > 1:
-                    ret = parser.parse(row[0])
-                    names.append(ret)
+        data = await self.fetch_wikitext("Skill_List", kind = "skill_list")
+        skills.update(parse_skill_list(data["wikitext"]["*"]))
+
+        jobs = self.bot.mongo.db.iron_saga_ingest_jobs
+        if mode == "new":
+            if name is None:
+                data = await self.fetch_wikitext("Pilot_List", kind = "pilot_list")
+                names = parse_pilot_list(data["wikitext"]["*"])
+            else:
+                names = [n.strip() for n in name.split(";")]
+            job = await IngestCheckpoint.create(jobs, "iron_saga_pilot", names)
+            indices = list(range(len(names)))
         else:
-            names = [n.strip() for n in name.split(";")]
+            job = await IngestCheckpoint.latest(jobs, "iron_saga_pilot", unfinished_only = mode == "resume")
+            if job is None:
+                return await interaction.followup.send("No job to continue.")
+            indices = job.indices("pending" if mode == "resume" else "failed")
 
         progress_bar = utils.ProgressBar(
-            progress_message = f"Total: {len(names)} pilots\nFetching...",
-            done_message = f"Total: {len(names)} pilots\nDone."
+            progress_message = f"Total: {len(indices)} pilots\nFetching...",
+            done_message = f"Total: {len(indices)} pilots\nDone."
         )
 
         msg = await interaction.followup.send(progress_bar.progress(0), wait = True)
 
+        # the crawler lives as long as the cog, only report what this run did
+        crawler_stats = self.crawler.stats()
         passed = []
         failed = []
         errors = {}
-        count = len(names)
+        count = len(indices)
+        done = 0
         prev = time.perf_counter()
-        col = self.bot.mongo.db.iron_saga_pilots
-        for i, name in enumerate(names):
+        col = self.pilots
+
+        async def process(index: int):
+            nonlocal done, prev
+            name = job.names[index]
             try:
                 pilot = await self.search_iswiki_for_pilot(name)
+                await col.bulk_write([pilot_upsert(pilot.model_dump())])
             except:
                 errors[name] = traceback.format_exc()
                 failed.append(name)
+                await job.mark(index, "failed", error = errors[name])
             else:
                 passed.append(pilot.en_name)
-                index = pilot.index
-                await col.update_one(
-                    {
-                        "index": index
-                    },
-                    {
-                        "$set": pilot.model_dump(),
-                        "$setOnInsert": {
-                            "aliases": []
-                        }
-                    },
-                    upsert = True
-                )
+                await job.mark(index, "passed")
             finally:
+                done += 1
                 cur = time.perf_counter()
                 if cur - prev >= 5:
-                    await msg.edit(content = progress_bar.progress((i + 1) / count))
                     prev = cur
+                    await msg.edit(content = progress_bar.progress(done / count))
 
+        # concurrency is throttled by the crawler
+        await asyncio.gather(*(process(index) for index in indices))
+        await job.finish()
+
+        stats = self.crawler.stats(since = crawler_stats)
         await msg.edit(
-            content = f"Passed: {len(passed)}\nFailed: {len(failed)}",
+            content =
+                f"Passed: {len(passed)}\nFailed: {len(failed)}\n"
+                f"Job {job.id}: {job.count('passed')}/{len(job.names)} passed, {job.count('failed')} failed, {job.count('pending')} pending\n"
+                f"Requests: {stats['requests']} ({stats['retries']} retries, {stats['throttled']} throttled)\n"
+                f"Average latency: {stats['latency_avg'] * 1000:.0f}ms",
             attachments = [
                 File.from_str(json.dumps({"passed": passed, "failed": failed}, indent=4, ensure_ascii=False), "result.json"),
                 File.from_str(json.dumps(errors, indent=4, ensure_ascii=False), "errors.json")
             ]
         )
 
-    async def search_iswiki_for_pilot(self, name):
-        resp = await self.bot.session.get(
+    @ac.command(name = "reparse_pilot")
+    @ac.guilds(*settings.TEST_GUILDS)
+    @ac.check(checks.owner_only())
+    async def reparse_pilot(self, interaction: Interaction):
+        """
+        Rebuild all pilots from stored wikitext snapshots without touching the wiki.
+        """
+        await auto_defer.defer(interaction, thinking = True)
+
+        snapshots = self.bot.mongo.db.iron_saga_wikitext
+        skill_doc = await snapshots.find_one({"kind": "skill_list"})
+        if skill_doc is None:
+            return await interaction.followup.send("No snapshot found. Run update_pilot first.")
+        skill_data = parse_skill_list(wiki.decompress_wikitext(skill_doc["wikitext"]))
+        skills.update(skill_data)
+
+        passed = []
+        failed = []
+        error_logs = {}
+        start = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        workers = os.cpu_count() or 1
+        pool = ProcessPoolExecutor(
+            max_workers = workers,
+            mp_context = multiprocessing.get_context("spawn"),
+            initializer = _init_reparse_worker,
+            initargs = (skill_data,)
+        )
+
+        async def collect(queue: MongoQueue, done: set[asyncio.Future]):
+            for future in done:
+                title, pilot, error = future.result()
+                if pilot is None:
+                    error_logs[title] = error
+                    failed.append(title)
+                else:
+                    passed.append(pilot["en_name"])
+                    await queue.write(pilot_upsert(pilot))
+
+        succeeded = False
+        try:
+            async with self.pilots.batch_write(100) as queue:
+                # keep a bounded window of snapshots in flight instead of the whole collection
+                pending = set()
+                async for doc in snapshots.find({"kind": "pilot"}, {"_id": 0, "title": 1, "page_id": 1, "wikitext": 1}):
+                    if len(pending) >= 2 * workers:
+                        done, pending = await asyncio.wait(pending, return_when = asyncio.FIRST_COMPLETED)
+                        await collect(queue, done)
+                    pending.add(loop.run_in_executor(pool, _reparse_snapshot, doc["title"], doc["page_id"], doc["wikitext"]))
+                if pending:
+                    done, pending = await asyncio.wait(pending)
+                    await collect(queue, done)
+            succeeded = True
+        finally:
+            if succeeded:
+                # workers are done by now, but joining them still blocks
+                await loop.run_in_executor(None, pool.shutdown)
+            else:
+                pool.shutdown(wait = False, cancel_futures = True)
+
+        await interaction.followup.send(
+            f"Passed: {len(passed)}\nFailed: {len(failed)}\nTime taken: {time.perf_counter() - start:.2f}s",
+            files = [
+                File.from_str(json.dumps({"passed": passed, "failed": failed}, indent=4, ensure_ascii=False), "result.json"),
+                File.from_str(json.dumps(error_logs, indent=4, ensure_ascii=False), "errors.json")
+            ]
+        )
+
+    async def fetch_wikitext(self, page: str, *, kind: str) -> dict:
+        """
+        Fetch raw wikitext of a page and keep a compressed snapshot of it for offline reparsing.
+        """
+        raw = await self.crawler.get_json(
             ISWIKI_API,
             params = {
                 "action":       "parse",
-                "prop":         "wikitext",
-                "page":         name,
+                "prop":         "wikitext|revid",
+                "page":         page,
                 "format":       "json",
                 "redirects":    1
             }
         )
-        raw = json.loads(await resp.content.read())
         if "error" in raw:
-            raise errors.QueryFailed(f"Page {name} doesn't exist.")
-
-        page_id = raw["parse"]["pageid"]
-        raw_basic_info = raw["parse"]["wikitext"]["*"]
-        ret = parser.parse(raw_basic_info)
-        skins: dict[str, PilotSkin] = {}
-        for item in ret:
-            if isinstance(item, dict):
-                skin_galleries = []
-
-                if "pilot_info" in item or "pilot_info_v2" in item:
-                    try:
-                        basic_info = item["pilot_info"]
-                        v2 = False
-                    except KeyError:
-                        basic_info = item["pilot_info_v2"]
-                        v2 = True
-
-                    elem = basic_info["image"]
-                    try:
-                        tabber = elem[0]["tabber"]
-                    except KeyError:
-                        filename = elem[0]["file"]
-                        skins.setdefault(filename, PilotSkin.from_filename(filename))
-                    except TypeError:
-                        filename = elem.strip()
-                        skins.setdefault(filename, PilotSkin.from_filename(filename))
-                    else:
-                        for tab in tabber:
-                            if isinstance(tab, dict):
-                                filename = tab["file"]
-                                skins.setdefault(filename, PilotSkin.from_filename(filename))
-
-                    for elem in basic_info.get("skins", []):
-                        if isinstance(elem, dict):
-                            if "skin_gallery" in elem:
-                                skin_galleries.append(elem)
-
-                if "skin_gallery" in item:
-                    skin_galleries.append(item)
-
-                for sg in skin_galleries:
-                    for s in sg["skin_gallery"]:
-                        filename, _, name = s.partition("|")
-                        if filename.startswith("File:"):
-                            filename = filename[5:]
-                        skins.setdefault(filename, PilotSkin.from_filename(filename))
-
-        if v2:
-            pilot = Pilot(
-                index = page_id,
-                en_name = basic_info["name (english/romaji)"],
-                jp_name = basic_info["name (original)"],
-                page_name = raw["parse"]["title"],
-                description = basic_info.get("background"),
-                personality = basic_info["personality"],
-                faction = basic_info["affiliation"],
-                artist = basic_info.get("artist"),
-                voice_actor = basic_info.get("seiyuu"),
-                stats = PilotStats(
-                    ranged_growth = basic_info["rangedgrowth"],
-                    melee_growth = basic_info["meleegrowth"],
-                    defense_growth = basic_info["defensegrowth"],
-                    reaction_growth = basic_info["reactiongrowth"],
-                ),
-                skills = (
-                    PilotSkill(
-                        name = skills[basic_info["activeskill"]]["name"],
-                        effect = skills[basic_info["activeskill"]]["effect"],
-                        copilot = COPILOT_SLOTS.get(basic_info.get("activeskillcopilot", "").lower())
-                    ),
-                    PilotSkill(
-                        name = skills[basic_info["passiveskill1"]]["name"],
-                        effect = skills[basic_info["passiveskill1"]]["effect"],
-                        copilot = COPILOT_SLOTS.get(basic_info.get("passiveskill1copilot", "").lower())
-                    ),
-                    PilotSkill(
-                        name = skills[basic_info["passiveskill2"]]["name"],
-                        effect = skills[basic_info["passiveskill2"]]["effect"],
-                        copilot = COPILOT_SLOTS.get(basic_info.get("passiveskill2copilot", "").lower())
-                    ),
-                    PilotSkill(
-                        name = skills[basic_info["passiveskill3"]]["name"],
-                        effect = skills[basic_info["passiveskill3"]]["effect"],
-                        copilot = COPILOT_SLOTS.get(basic_info.get("passiveskill3copilot", "").lower())
-                    )
-                ),
-                awaken_skills = (
-                    PilotSkill(
-                        name = skills[basic_info["awakenactiveskill"]]["name"],
-                        effect = skills[basic_info["awakenactiveskill"]]["effect"],
-                        copilot = COPILOT_SLOTS.get(basic_info.get("awakenactiveskillcopilot", "").lower())
-                    ),
-                    PilotSkill(
-                        name = skills[basic_info["awakenpassiveskill1"]]["name"],
-                        effect = skills[basic_info["awakenpassiveskill1"]]["effect"],
-                        copilot = COPILOT_SLOTS.get(basic_info.get("awakenpassiveskill1copilot", "").lower())
-                    ),
-                    PilotSkill(
-                        name = skills[basic_info["awakenpassiveskill2"]]["name"],
-                        effect = skills[basic_info["awakenpassiveskill2"]]["effect"],
-                        copilot = COPILOT_SLOTS.get(basic_info.get("awakenpassiveskill2copilot", "").lower())
-                    ),
-                    PilotSkill(
-                        name = skills[basic_info["awakenpassiveskill3"]]["name"],
-                        effect = skills[basic_info["awakenpassiveskill3"]]["effect"],
-                        copilot = COPILOT_SLOTS.get(basic_info.get("awakenpassiveskill3copilot", "").lower())
-                    )
-                ) if "awakenactiveskill" in basic_info else (),
-                copilot_slots = PilotCopilotSlots(
-                    Attack = bool(basic_info.get("copilotattack")),
-                    Tech = bool(basic_info.get("copilottech")),
-                    Defense = bool(basic_info.get("copilotdefense")),
-                    Support = bool(basic_info.get("copilotsupport")),
-                    Control = bool(basic_info.get("copilotcontrol")),
-                    Special = bool(basic_info.get("copilotspecial"))
-                ),
-                skins = list(skins.values())
-            )
-        else:
-            pilot = Pilot(
-                index = page_id,
-                en_name = basic_info["name (english/romaji)"],
-                jp_name = basic_info["name (original)"],
-                page_name = raw["parse"]["title"],
-                description = basic_info.get("background"),
-                personality = basic_info["personality"],
-                faction = basic_info["affiliation"],
-                artist = basic_info.get("artist"),
-                voice_actor = basic_info.get("seiyuu"),
-                stats = PilotStats.estimated_from_stats(
-                    ranged = utils.to_int(basic_info["shootingmax"]),
-                    melee = utils.to_int(basic_info["meleemax"]),
-                    defense = utils.to_int(basic_info["defensemax"]),
-                    reaction = utils.to_int(basic_info["reactionmax"])
-                ),
-                skills = (
-                    PilotSkill(
-                        name = basic_info["activeskillname"],
-                        effect = basic_info["activeskilleffect"],
-                        copilot = COPILOT_SLOTS.get(basic_info.get("activeskilltype", "").lower())
-                    ),
-                    PilotSkill(
-                        name = basic_info["passiveskill1name"],
-                        effect = basic_info["passiveskill1effect"],
-                        copilot = COPILOT_SLOTS.get(basic_info.get("passiveskill1type", "").lower())
-                    ),
-                    PilotSkill(
-                        name = basic_info["passiveskill2name"],
-                        effect = basic_info["passiveskill2effect"],
-                        copilot = COPILOT_SLOTS.get(basic_info.get("passiveskill2type", "").lower())
-                    ),
-                    PilotSkill(
-                        name = basic_info["passiveskill3name"],
-                        effect = basic_info["passiveskill3effect"],
-                        copilot = COPILOT_SLOTS.get(basic_info.get("passiveskill3type", "").lower())
-                    )
-                ),
-                copilot_slots = PilotCopilotSlots(
-                    Attack = bool(basic_info.get("copilotattack")),
-                    Tech = bool(basic_info.get("copilottech")),
-                    Defense = bool(basic_info.get("copilotdefense")),
-                    Support = bool(basic_info.get("copilotsupport")),
-                    Control = bool(basic_info.get("copilotcontrol")),
-                    Special = bool(basic_info.get("copilotspecial"))
-                ),
-                skins = list(skins.values())
-            )
+            raise errors.QueryFailed(f"Page {page} doesn't exist.")
 
-        return pilot
+        data = raw["parse"]
+        await self.bot.mongo.db.iron_saga_wikitext.update_one(
+            {
+                "page_id": data["pageid"]
+            },
+            {
+                "$set": {
+                    "title": data["title"],
+                    "kind": kind,
+                    "revid": data.get("revid"),
+                    "wikitext": wiki.compress_wikitext(data["wikitext"]["*"]),
+                    "fetched_at": utils.now()
+                }
+            },
+            upsert = True
+        )
+        return data
+
+    async def search_iswiki_for_pilot(self, name):
+        data = await self.fetch_wikitext(name, kind = "pilot")
+        return parse_pilot(data["title"], data["pageid"], data["wikitext"]["*"])
+
+    async def read_attachment(self, attachment: discord.Attachment) -> AsyncIterator[bytes]:
+        async with self.bot.session.get(attachment.url) as resp:
+            resp.raise_for_status()
+            async for chunk in resp.content.iter_chunked(1 << 16):
+                yield chunk
+
+    def stream_attachment(self, attachment: discord.Attachment, collection: str) -> ValidatedJSONStream:
+        return ValidatedJSONStream(
+            self.read_attachment(attachment),
+            JSON_MODELS[collection],
+            offload = attachment.size > OFFLOAD_SIZE
+        )
+
+    def ingest_error_files(self, stream: ValidatedJSONStream) -> list[File]:
+        if stream.errors:
+            return [File.from_str(json.dumps(dict(stream.errors), indent = 4, ensure_ascii = False), "invalid.json")]
+        else:
+            return []
+
+    def ingest_check(self, stream: ValidatedJSONStream) -> Callable[[int], None]:
+        def check(count: int):
+            if count == 0:
+                raise errors.InvalidInput(f"No valid entry out of {stream.count}.")
+            if len(stream.errors) > stream.count * MAX_INVALID_RATIO:
+                raise errors.InvalidInput(f"Too many invalid entries: {len(stream.errors)} out of {stream.count}.")
+        return check
+
+    async def replace_from_attachment(self, interaction: Interaction, attachment: discord.Attachment, collection: str):
+        await auto_defer.defer(interaction, thinking = True)
+        stream = self.stream_attachment(attachment, collection)
+        col = self.json_collections[collection]
+        try:
+            count = await col.replace_all(stream, indexes = self.db_indexes[col.name], hash_field = "_hash", check = self.ingest_check(stream))
+        except errors.InvalidInput as e:
+            return await interaction.followup.send(f"{e.message}\nNothing was replaced.", files = self.ingest_error_files(stream))
+        await interaction.followup.send(
+            f"Done. Replaced with {count} {collection}.\nSkipped {len(stream.errors)} invalid entries.",
+            files = self.ingest_error_files(stream)
+        )
 
     @ac.check(checks.owner_only())
     async def update_parts(self, interaction: Interaction, message: discord.Message):
-        attachment = message.attachments[0]
-        bytes_ = await attachment.read()
-        data = json.loads(bytes_)
-        col = self.bot.mongo.db.iron_saga_parts
-        await col.delete_many({})
-        for index, doc in enumerate(data):
-            await col.insert_one(doc)
-        await interaction.response.send_message("Done.")
+        await self.replace_from_attachment(interaction, message.attachments[0], "parts")
 
     @ac.check(checks.owner_only())
     async def update_pets(self, interaction: Interaction, message: discord.Message):
-        attachment = message.attachments[0]
-        bytes_ = await attachment.read()
-        data = json.loads(bytes_)
-        col = self.bot.mongo.db.iron_saga_pets
-        await col.delete_many({})
-        for index, doc in enumerate(data):
-            await col.insert_one(doc)
-        await interaction.response.send_message("Done.")
+        await self.replace_from_attachment(interaction, message.attachments[0], "pets")
+
+    @ac.command(name = "sync_iron_saga")
+    @ac.describe(
+        collection = "Collection to sync",
+        data = "JSON file containing all documents"
+    )
+    @ac.guilds(*settings.TEST_GUILDS)
+    @ac.check(checks.owner_only())
+    async def sync_iron_saga(self, interaction: Interaction, collection: typing.Literal["parts", "pets"], data: discord.Attachment):
+        """
+        Only write the differences between the uploaded data and the database.
+        """
+        await auto_defer.defer(interaction, thinking = True)
+        stream = self.stream_attachment(data, collection)
+        try:
+            result = await self.json_collections[collection].sync(stream, key = SYNC_KEYS[collection], check = self.ingest_check(stream))
+        except errors.InvalidInput as e:
+            return await interaction.followup.send(f"{e.message}\nNothing was synced.", files = self.ingest_error_files(stream))
+        await interaction.followup.send(
+            f"{result.summary()}\nSkipped: {len(stream.errors)}",
+            files = [
+                File.from_str(
+                    json.dumps(
+                        {
+                            "inserted": result.inserted,
+                            "updated": result.updated,
+                            "deleted": result.deleted
+                        },
+                        indent = 4,
+                        ensure_ascii = False
+                    ),
+                    "diff.json"
+                ),
+                *self.ingest_error_files(stream)
+            ]
+        )
 
 #=============================================================================================================================#
 
@@ -15,7 +15,7 @@ import random
 
 from belphegor import utils
 from belphegor.settings import settings
-from belphegor.templates import ui_ex, paginators, transformers
+from belphegor.templates import ui_ex, paginators, panels, transformers, auto_defer
 from belphegor.templates.discord_types import Interaction
 from .misc_core import calculator
 
@@ -131,8 +131,8 @@ class SauceSelector(paginators.SingleRowPaginator):
         paginator.images = {name: url for name, url in images}
         return paginator
 
-    def render_embed(self):
-        embed = super().render_embed()
+    def build_page_embed(self, index: int):
+        embed = super().build_page_embed(index)
         embed.title = f"Select image to search for sauce:"
         return embed
 
@@ -215,7 +215,7 @@ class Misc(commands.Cog):
             raw.append("".join(line))
         out = "\n".join(raw)
 
-        await interaction.response.send_message(f"```\n{out}\n```")
+        await panels.ControlPanel.from_parts(content = f"```\n{out}\n```").reply(interaction)
 
     @ac.command(name = "calc", description = "A calculator with input rule be quite close to handwritten math formulas.")
     async def calc(
@@ -247,7 +247,7 @@ class Misc(commands.Cog):
         await calc.initialize(interaction)
 
     async def request_sauce(self, interaction: Interaction, url: str):
-        await interaction.response.defer(thinking = True)
+        await auto_defer.defer(interaction, thinking = True)
         payload = aiohttp.FormData()
         payload.add_field("file", b"", filename = "", content_type = "application/octet-stream")
         payload.add_field("url", url)
@@ -340,7 +340,7 @@ class Misc(commands.Cog):
             else:
                 await self.request_sauce(interaction, targets[0][1])
         else:
-            await interaction.response.send_message("This message doesn't have any attachment.")
+            await panels.ControlPanel.from_parts(content = "This message doesn't have any attachment.").reply(interaction)
 
     @commands.command(name = "char")
     async def cmd_char(self, ctx, *, characters: str):
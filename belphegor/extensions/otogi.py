@@ -2,13 +2,14 @@ import discord
 from discord import app_commands as ac
 from discord.ext import commands
 from pydantic import BaseModel
+from pymongo import IndexModel
 import typing
 import functools
 import random
 
 from belphegor import utils
 from belphegor.utils import wiki
-from belphegor.templates import ui_ex, paginators, queries
+from belphegor.templates import ui_ex, paginators, panels, queries
 from belphegor.templates.discord_types import Interaction
 
 if typing.TYPE_CHECKING:
@@ -43,6 +44,18 @@ EMOJIS = {
     "invoker": discord.PartialEmoji(name = "invoker", id = 337860298667065345)
 }
 
+# case insensitive, so the name index also serves sorting
+NAME_COLLATION = {
+    "locale": "en",
+    "strength": 2
+}
+
+DAEMON_INDEXES = [
+    IndexModel("index", unique = True),
+    IndexModel("name", collation = NAME_COLLATION),
+    IndexModel("aliases")
+]
+
 #=============================================================================================================================#
 
 class DaemonEffect(BaseModel):
@@ -175,8 +188,8 @@ class DaemonSelector(paginators.SingleRowPaginator):
         paginator.daemons = {d.name: d for d in daemons}
         return paginator
 
-    def render_embed(self):
-        embed = super().render_embed()
+    def build_page_embed(self, index: int):
+        embed = super().build_page_embed(index)
         embed.title = f"Found {len(self.daemons)} daemons"
         return embed
 
@@ -332,9 +345,15 @@ class ContinuousSummon(paginators.BasePaginator):
 #=============================================================================================================================#
 
 class Otogi(commands.Cog):
+    db_indexes = {
+        "otogi_daemons": DAEMON_INDEXES
+    }
+
     def __init__(self, bot: "Belphegor"):
         self.bot = bot
         self.db = bot.mongo.db
+        self.daemons = self.db.otogi_daemons.with_cache()
+        self.summon_pool = self.db.otogi_summon_pool.with_cache()
 
     @ac.command(name = "daemon")
     @ac.describe(name = "Daemon name")
@@ -342,9 +361,7 @@ class Otogi(commands.Cog):
         """
         Display a daemon info.
         """
-        daemons = []
-
-        async for doc in self.db.otogi_daemons.aggregate([
+        daemons = await self.daemons.bind(Daemon).cached_aggregate([
             {
                 "$match": queries.match_any(name, ["name", "aliases"])
             },
@@ -352,17 +369,11 @@ class Otogi(commands.Cog):
                 "$sort": {
                     "name": 1
                 }
-            },
-            {
-                "$project": {
-                    "_id": 0
-                }
             }
-        ]):
-            daemons.append(Daemon(**doc))
+        ], collation = NAME_COLLATION)
 
         if len(daemons) == 0:
-            return await interaction.response.send_message(f"Can't find any daemon with name: {name}")
+            return await panels.ControlPanel.from_parts(content = f"Can't find any daemon with name: {name}").reply(interaction)
 
         if len(daemons) > 1:
             paginator = DaemonSelector.from_daemons(daemons)
@@ -374,7 +385,7 @@ class Otogi(commands.Cog):
     @ac.command(name = "ls")
     async def lunchsummon(self, interaction: Interaction):
         pool = {}
-        async for doc in self.db.otogi_summon_pool.aggregate([
+        for doc in await self.summon_pool.cached_aggregate([
             {
                 "$unwind": "$pool"
             },
@@ -23,6 +23,12 @@ class BelphegorSettings(BaseSettings):
 
     EQ_ALERT_API_USER_AGENT: str
 
+    VIEW_MEMORY_BUDGET: int = 64 << 20
+    MAX_LIVE_VIEWS: int = 2000
+
+    # seconds before an interaction without response is deferred automatically
+    AUTO_DEFER_AFTER: float = 2.0
+
     USER_AGENT: str = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36 Edg/124.0.0.0"
 
     model_config = SettingsConfigDict(env_file = ".env", env_file_encoding = "utf-8")
@@ -0,0 +1,96 @@
+import discord
+import asyncio
+from datetime import datetime
+
+from belphegor import utils
+from belphegor.settings import settings
+from .discord_types import Interaction
+
+#=============================================================================================================================#
+
+log = utils.get_logger()
+
+#=============================================================================================================================#
+
+_KEY = "auto_defer"
+
+def interaction_label(interaction: Interaction) -> str:
+    command = interaction.command
+    return command.qualified_name if command else interaction.type.name
+
+def record_first_response(interaction: Interaction, *, auto: bool = False, responded_at: datetime | None = None):
+    """
+    Record the time from the interaction creation on Discord's side to our first response, which is what the deadline is about. \
+    Call it right before responding, only the first call per interaction counts. \
+    Pass responded_at to record a response that has already been sent, timed from when it was.
+    """
+    if "responded_at" in interaction.extras:
+        return
+    if responded_at is None:
+        if interaction.response.is_done():
+            return
+        responded_at = utils.now()
+    interaction.extras["responded_at"] = responded_at
+    metrics = interaction.client.metrics
+    metrics.observe(
+        "interaction_first_response_seconds",
+        (responded_at - interaction.created_at).total_seconds(),
+        command = interaction_label(interaction),
+        auto_deferred = str(auto).lower()
+    )
+
+class AutoDefer:
+    """
+    Defer an interaction if the handler hasn't responded after delay seconds, \
+    so slow handlers don't miss Discord's 3 seconds deadline. \
+    Application commands get a "thinking" response, components a silent deferred update.
+    """
+
+    def __init__(self, interaction: Interaction, delay: float):
+        self.interaction = interaction
+        self.thinking = interaction.type is discord.InteractionType.application_command
+        self._handle = asyncio.get_running_loop().call_later(delay, self._fire)
+        self._task: asyncio.Task | None = None
+
+    def _fire(self):
+        self._task = asyncio.create_task(self._defer())
+
+    async def _defer(self):
+        response = self.interaction.response
+        if response.is_done():
+            return
+        responded_at = utils.now()
+        try:
+            await response.defer(thinking = self.thinking)
+        except discord.InteractionResponded:
+            pass
+        except discord.HTTPException as e:
+            log.warning(f"Failed to auto defer interaction {self.interaction.id}: {e!r}")
+        else:
+            record_first_response(self.interaction, auto = True, responded_at = responded_at)
+            log.debug(f"Auto deferred {interaction_label(self.interaction)} interaction {self.interaction.id}")
+
+    async def disarm(self):
+        self._handle.cancel()
+        # a deferral already on its way must land before the caller checks the response state
+        if self._task is not None:
+            await self._task
+
+def arm(interaction: Interaction, delay: float | None = None) -> AutoDefer:
+    watchdog = interaction.extras.get(_KEY)
+    if watchdog is None:
+        watchdog = interaction.extras[_KEY] = AutoDefer(interaction, settings.AUTO_DEFER_AFTER if delay is None else delay)
+    return watchdog
+
+async def disarm(interaction: Interaction):
+    """Stop the watchdog before responding."""
+    watchdog = interaction.extras.pop(_KEY, None)
+    if watchdog is not None:
+        await watchdog.disarm()
+    record_first_response(interaction)
+
+async def defer(interaction: Interaction, *, thinking: bool = False, ephemeral: bool = False):
+    """Defer the interaction unless it has already been, by the watchdog or anything else."""
+    await disarm(interaction)
+    if not interaction.response.is_done():
+        await interaction.response.defer(thinking = thinking, ephemeral = ephemeral)
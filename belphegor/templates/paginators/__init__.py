@@ -1,4 +1,5 @@
 from .base import *
+from .page_sources import *
 from .page_navigators import *
 from .continuous_inputs import *
 from .prompts import *
\ No newline at end of file
@@ -1,12 +1,53 @@
+import discord
 import typing
+import asyncio
+import time
+import weakref
+from collections.abc import Callable
 
 from belphegor import utils
+from belphegor.templates import auto_defer
 from belphegor.templates.panels import ControlPanel
 from belphegor.templates.discord_types import Interaction
 
 #=============================================================================================================================#
 
+log = utils.get_logger()
+
+#=============================================================================================================================#
+
+# paginator class -> attribute name -> (constructor, whether the component takes a paginator reference)
+_component_factories: weakref.WeakKeyDictionary[type, dict[str, tuple[Callable[..., typing.Any], bool]]] = weakref.WeakKeyDictionary()
+
+def get_component_factory(cls: type, key: str) -> tuple[Callable[..., typing.Any], bool]:
+    factories = _component_factories.get(cls)
+    if factories is None:
+        factories = _component_factories[cls] = {}
+    factory = factories.get(key)
+    if factory is None:
+        constructor = utils.get_class_hints(cls)[key]
+        component_cls = typing.get_origin(constructor) or constructor
+        inject = isinstance(component_cls, type) and "paginator" in utils.get_class_hints(component_cls)
+        factory = factories[key] = (constructor, inject)
+    return factory
+
 class BasePaginator(ControlPanel):
+    """
+    Base of interactive panels. Updates are rate limited per message: \
+    an update coming within edit_interval of the last edit is acknowledged right away, \
+    and only the latest state is rendered and pushed once the interval has passed.
+    """
+
+    edit_interval: float = 1.0
+
+    def __new__(cls, *args, **kwargs) -> typing.Self:
+        obj = super().__new__(cls, *args, **kwargs)
+        obj._last_edit = 0.0
+        obj._edit_lock = asyncio.Lock()
+        obj._pending_interaction = None
+        obj._flush_task = None
+        return obj
+
     def render(self):
         return self
 
@@ -17,12 +58,43 @@ class BasePaginator(ControlPanel):
         await self.reply(interaction)
 
     async def update(self, interaction: Interaction):
-        self.render()
-        await self.reply(interaction)
+        now = time.monotonic()
+        if self._flush_task is None and now - self._last_edit >= self.edit_interval:
+            async with self._edit_lock:
+                self._last_edit = time.monotonic()
+                self.render()
+                await self.reply(interaction)
+        else:
+            await auto_defer.defer(interaction)
+            self._pending_interaction = interaction
+            if self._flush_task is None:
+                self._flush_task = asyncio.create_task(self._flush(self._last_edit + self.edit_interval - now))
+
+    async def _flush(self, delay: float):
+        try:
+            await asyncio.sleep(delay)
+            async with self._edit_lock:
+                interaction = self._pending_interaction
+                self._pending_interaction = None
+                if interaction is None or (self.view is not None and self.view.is_finished()):
+                    return
+                self._last_edit = time.monotonic()
+                self.render()
+                await self.reply(interaction)
+        except discord.HTTPException as e:
+            log.warning(f"Failed to update {type(self).__name__}: {e!r}")
+        finally:
+            self._flush_task = None
+
+    def stop(self):
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        super().stop()
 
     def get_paginator_attribute(self, key: str, *args, **kwargs):
-        value = utils.get_default_attribute(self, key, *args, **kwargs)
-        hints = typing.get_type_hints(type(value))
-        if "paginator" in hints:
+        constructor, inject = get_component_factory(type(self), key)
+        value = constructor(*args, **kwargs)
+        if inject:
             value.paginator = self
         return value
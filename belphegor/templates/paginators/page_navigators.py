@@ -1,13 +1,17 @@
 import discord
 import typing
+from collections import OrderedDict
 from collections.abc import Callable
 import asyncio
+import math
+import weakref
 from pydantic import BaseModel
 
 from belphegor import utils
 from belphegor.templates import ui_ex
 from belphegor.templates.discord_types import Interaction
-from .base import BasePaginator
+from .base import BasePaginator, get_component_factory
+from .page_sources import PageSource
 
 #=============================================================================================================================#
 
@@ -80,43 +84,99 @@ class EmbedTemplate(BaseModel, typing.Generic[_VT]):
         else:
             return v
 
-    def __call__(self, items: list[PageItem[_VT]], first_index: int) -> discord.Embed:
-        embed = discord.Embed(
-            title = self._get_value("title"),
-            url = self._get_value("url"),
-            colour = self._get_value("colour")
-        )
+    def compile(self) -> "CompiledEmbedTemplate":
+        """
+        Bake the static parts into a base embed dict. Templates using only class defaults are compiled once per class.
+        """
+        if self.model_fields_set:
+            return CompiledEmbedTemplate(self)
+        cls = type(self)
+        compiled = _compiled_templates.get(cls)
+        if compiled is None:
+            compiled = _compiled_templates[cls] = CompiledEmbedTemplate(self)
+        return compiled
+
+    @classmethod
+    def compiled(cls) -> "CompiledEmbedTemplate":
+        """Compiled template of the class defaults, without creating an instance once cached."""
+        compiled = _compiled_templates.get(cls)
+        if compiled is None:
+            compiled = cls().compile()
+        return compiled
 
-        desc_list = []
-        for i, item in enumerate(items):
-            desc = self._get_value("description", item, first_index + i)
-            if desc:
-                desc_list.append(desc)
-            field = self._get_value("fields", item, first_index + i)
-            if field:
-                name, value, inline = field
-                if name and value:
-                    embed.add_field(name = name, value = value, inline = inline)
-        if desc_list:
-            description = self.separator.join(desc_list)
-            embed.description = description
+    def __call__(self, items: list[PageItem[_VT]], first_index: int) -> discord.Embed:
+        return self.compile()(items, first_index)
 
-        embed.set_thumbnail(url = self._get_value("thumbnail_url"))
-        embed.set_image(url = self._get_value("image_url"))
+EmbedTemplate.model_rebuild()
 
-        author = self._get_value("author")
+def _constant(value):
+    return lambda item, index: value
+
+class CompiledEmbedTemplate:
+    __slots__ = ("base", "description", "fields", "separator")
+
+    def __init__(self, template: EmbedTemplate):
+        base = {"type": "rich"}
+        # static parts are built the same way as with the Embed setters, they are never called with an item
+        for key in ("title", "url"):
+            value = template._get_value(key)
+            if value is not None:
+                base[key] = str(value)
+        colour = template._get_value("colour")
+        if colour is not None:
+            base["color"] = colour.value
+        for key, embed_key in (("thumbnail_url", "thumbnail"), ("image_url", "image")):
+            url = template._get_value(key)
+            if url is not None:
+                base[embed_key] = {"url": str(url)}
+        author = template._get_value("author")
         if author:
             name, url, icon = author
-            embed.set_author(name = name, url = url, icon_url = icon)
-
-        footer = self._get_value("footer")
+            base["author"] = {"name": str(name)}
+            if url is not None:
+                base["author"]["url"] = str(url)
+            if icon is not None:
+                base["author"]["icon_url"] = str(icon)
+        footer = template._get_value("footer")
         if footer:
             text, icon = footer
-            embed.set_footer(text = text, icon_url = icon)
+            base["footer"] = {"text": str(text)}
+            if icon is not None:
+                base["footer"]["icon_url"] = str(icon)
 
-        return embed
+        self.base = base
+        self.description = template.description if template.description is None or callable(template.description) else _constant(template.description)
+        self.fields = template.fields if template.fields is None or callable(template.fields) else _constant(template.fields)
+        self.separator = template.separator
+
+    def __call__(self, items: list[PageItem[_VT]], first_index: int) -> discord.Embed:
+        # shallow copy, the Embed setters replace nested dicts instead of mutating them
+        data = self.base.copy()
+        describe = self.description
+        make_field = self.fields
+
+        desc_list = []
+        fields = []
+        for i, item in enumerate(items, first_index):
+            if describe is not None:
+                desc = describe(item, i)
+                if desc:
+                    desc_list.append(desc)
+            if make_field is not None:
+                field = make_field(item, i)
+                if field:
+                    name, value, inline = field
+                    if name and value:
+                        fields.append({"name": str(name), "value": str(value), "inline": inline})
+        if desc_list:
+            data["description"] = self.separator.join(desc_list)
+        if fields:
+            data["fields"] = fields
+
+        return discord.Embed.from_dict(data)
+
+_compiled_templates: weakref.WeakKeyDictionary[type[EmbedTemplate], CompiledEmbedTemplate] = weakref.WeakKeyDictionary()
 
-EmbedTemplate.model_rebuild()
 
 #=============================================================================================================================#
 
@@ -205,6 +265,10 @@ class SingleRowPaginator(BasePaginator, typing.Generic[_VT]):
     select_menu: PaginatorSelect
     embed_template: PaginatorEmbedTemplate
 
+    # embeds of recently shown and prefetched pages
+    embed_cache_size: int = 5
+    page_embeds: OrderedDict[int, discord.Embed]
+
     def __init__(self, items: PageItem[_VT] | list[PageItem[_VT]] | list[_VT], *, page_size: int = 20, selectable: bool = False):
         if isinstance(items, PageItem):
             self.items = items.children
@@ -217,18 +281,58 @@ class SingleRowPaginator(BasePaginator, typing.Generic[_VT]):
         self.current_index = 0
         self.queue = asyncio.Queue()
         self.selectable = selectable
+        self.page_embeds = OrderedDict()
+        self._prefetch_task = None
 
-    def render_embed(self) -> discord.Embed:
-        current_items = self.pages[self.current_index]
-        current_first_index = self.page_size * self.current_index
+    def get_page(self, index: int) -> tuple[PageItem[_VT], ...]:
+        return self.pages[index]
+
+    def has_page(self, index: int) -> bool:
+        return 0 <= index < self.page_amount
+
+    def build_page_embed(self, index: int) -> discord.Embed:
+        template_cls, _ = get_component_factory(type(self), "embed_template")
+        return template_cls.compiled()(self.get_page(index), self.page_size * index)
 
-        template = self.get_paginator_attribute("embed_template")
-        embed = template(current_items, current_first_index)
+    def _trim_page_embeds(self):
+        while len(self.page_embeds) > self.embed_cache_size:
+            self.page_embeds.popitem(last = False)
+
+    def get_page_embed(self, index: int) -> discord.Embed:
+        embed = self.page_embeds.get(index)
+        if embed is None:
+            embed = self.page_embeds[index] = self.build_page_embed(index)
+            self._trim_page_embeds()
+        else:
+            self.page_embeds.move_to_end(index)
+        return embed
+
+    async def _prefetch(self, index: int):
+        # runs while the reply is in flight, one page per loop iteration to keep clicks responsive
+        for target in (index + 1, index - 1):
+            await asyncio.sleep(0)
+            if self.current_index != index:
+                return
+            if target not in self.page_embeds and self.has_page(target):
+                self.page_embeds[target] = self.build_page_embed(target)
+                # the shown page stays the most recent one
+                if index in self.page_embeds:
+                    self.page_embeds.move_to_end(index)
+                self._trim_page_embeds()
+
+    def prefetch(self):
+        """Build the embeds of the pages next to the current one in background."""
+        if self._prefetch_task is not None:
+            self._prefetch_task.cancel()
+        self._prefetch_task = asyncio.create_task(self._prefetch(self.current_index))
+
+    def render_embed(self) -> discord.Embed:
+        embed = self.get_page_embed(self.current_index)
         self.edit_blueprint(embed = embed)
         return embed
 
     def render_view(self) -> ui_ex.View:
-        current_items = self.pages[self.current_index]
+        current_items = self.get_page(self.current_index)
         current_first_index = self.page_size * self.current_index
 
         if self.view:
@@ -252,9 +356,87 @@ class SingleRowPaginator(BasePaginator, typing.Generic[_VT]):
 
             view.add_exit_button(row = 2)
 
-        return view
+        return self.view
 
     def render(self):
         self.render_embed()
         self.render_view()
+        self.prefetch()
         return self
+
+    def stop(self):
+        if self._prefetch_task is not None:
+            self._prefetch_task.cancel()
+            self._prefetch_task = None
+        super().stop()
+
+class WindowedPaginator(SingleRowPaginator[_VT]):
+    """
+    Paginator fetching its pages on demand from a page source instead of holding every item. \
+    A missing page is fetched along with `window` pages on each side in a single range query, \
+    and at most cache_size pages are kept, least recently shown first out.
+    """
+
+    source: PageSource[_VT]
+    item_count: int
+    window: int
+    cache_size: int
+    page_cache: OrderedDict[int, tuple[PageItem[_VT], ...]]
+
+    def __init__(self, source: PageSource[_VT], *, page_size: int = 20, selectable: bool = False, window: int = 1, cache_size: int = 8):
+        # pages are fetched from the source instead, page_amount is set by load
+        super().__init__([], page_size = page_size, selectable = selectable)
+        self.source = source
+        self.window = window
+        self.cache_size = max(cache_size, 2 * window + 1)
+        self.page_cache = OrderedDict()
+        self.item_count = 0
+        self.loaded = False
+        self._fetch_lock = asyncio.Lock()
+
+    async def load(self):
+        """Count the items, call this before checking item_count."""
+        self.item_count = await self.source.count()
+        self.page_amount = math.ceil(self.item_count / self.page_size)
+        self.loaded = True
+
+    async def load_page(self, index: int):
+        async with self._fetch_lock:
+            if index in self.page_cache:
+                self.page_cache.move_to_end(index)
+                return
+
+            first = max(0, index - self.window)
+            last = min(self.page_amount - 1, index + self.window)
+            # neighbours at the edges of the window may still be cached
+            while first < index and first in self.page_cache:
+                first += 1
+            while last > index and last in self.page_cache:
+                last -= 1
+
+            start = first * self.page_size
+            stop = min(self.item_count, (last + 1) * self.page_size)
+            values = await self.source.fetch(start, stop) if stop > start else []
+            items = [PageItem(value = value) for value in values]
+            for offset, page in enumerate(utils.grouper(items, self.page_size, incomplete = "missing")):
+                self.page_cache[first + offset] = page
+            self.page_cache.setdefault(index, ())
+            self.page_cache.move_to_end(index)
+            while len(self.page_cache) > self.cache_size:
+                self.page_cache.popitem(last = False)
+
+    def get_page(self, index: int) -> tuple[PageItem[_VT], ...]:
+        return self.page_cache.get(index, ())
+
+    def has_page(self, index: int) -> bool:
+        return index in self.page_cache
+
+    async def initialize(self, interaction: Interaction, *, public: bool = False):
+        if not self.loaded:
+            await self.load()
+        await self.load_page(self.current_index)
+        await super().initialize(interaction, public = public)
+
+    async def update(self, interaction: Interaction):
+        await self.load_page(self.current_index)
+        await super().update(interaction)
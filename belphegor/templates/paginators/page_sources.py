@@ -0,0 +1,67 @@
+import typing
+import abc
+from collections.abc import Sequence
+from pydantic import BaseModel
+
+from belphegor.db import MongoCollectionEX
+
+#=============================================================================================================================#
+
+_VT = typing.TypeVar("_VT")
+
+class PageSource(abc.ABC, typing.Generic[_VT]):
+    """Where a windowed paginator gets its items from, one range at a time."""
+
+    @abc.abstractmethod
+    async def count(self) -> int:
+        pass
+
+    @abc.abstractmethod
+    async def fetch(self, start: int, stop: int) -> list[_VT]:
+        pass
+
+class ListPageSource(PageSource[_VT]):
+    def __init__(self, items: Sequence[_VT]):
+        self.items = items
+
+    async def count(self) -> int:
+        return len(self.items)
+
+    async def fetch(self, start: int, stop: int) -> list[_VT]:
+        return list(self.items[start:stop])
+
+class MongoPageSource(PageSource[_VT]):
+    """
+    Page source running an aggregate pipeline with $skip and $limit for each range. \
+    The count is computed with count_pipeline, which defaults to the pipeline itself but usually only needs its $match stages.
+    If model is set, documents are projected and decoded into it.
+    """
+
+    def __init__(
+        self,
+        collection: MongoCollectionEX,
+        pipeline: list[dict],
+        *,
+        model: type[BaseModel] | None = None,
+        count_pipeline: list[dict] | None = None,
+        **kwargs
+    ):
+        self.collection = collection
+        self.pipeline = pipeline
+        self.model = model
+        self.count_pipeline = pipeline if count_pipeline is None else count_pipeline
+        self.kwargs = kwargs
+
+    async def count(self) -> int:
+        docs = await self.collection.cached_aggregate([*self.count_pipeline, {"$count": "count"}], **self.kwargs)
+        if docs:
+            return docs[0]["count"]
+        else:
+            return 0
+
+    async def fetch(self, start: int, stop: int) -> list[_VT]:
+        pipeline = [*self.pipeline, {"$skip": start}, {"$limit": stop - start}]
+        if self.model is None:
+            return await self.collection.aggregate(pipeline, **self.kwargs).to_list(None)
+        else:
+            return await self.collection.bind(self.model).to_list(pipeline, **self.kwargs)
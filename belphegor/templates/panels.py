@@ -1,10 +1,11 @@
 import discord
 from discord.utils import MISSING
 import typing
+import json
 from collections.abc import Sequence
 
 from belphegor import utils
-from . import ui_ex
+from . import ui_ex, auto_defer
 from .discord_types import Interaction
 
 #=============================================================================================================================#
@@ -94,6 +95,8 @@ class ControlPanel:
     """A control panel is a representation of the "reaction chain" that a slash command sends and listens to, but specifically contained in a single message."""
 
     target_message: discord.Message = None
+    # components of a persistent panel are handled by custom_id routes, see templates.persistent
+    persistent: bool = False
 
     @property
     def blueprint(self) -> Blueprint:
@@ -118,6 +121,7 @@ class ControlPanel:
         obj.target_message = None
         obj.blueprint = Blueprint()
         obj.view = None
+        obj._sent_fingerprint = None
         return obj
 
     def __init__(self):
@@ -173,11 +177,54 @@ class ControlPanel:
         )
         return obj
 
+    def _edit_payload(self) -> dict[str, typing.Any]:
+        blueprint = self.blueprint
+        return {
+            "content": blueprint.content or None,
+            "embeds": blueprint.embeds if blueprint.embeds else [blueprint.embed] if blueprint.embed else [],
+            "attachments": blueprint.files if blueprint.files else [blueprint.file] if blueprint.file else [],
+            "view": self.view
+        }
+
+    @staticmethod
+    def _fingerprint(payload: dict[str, typing.Any]) -> dict[str, typing.Any]:
+        """
+        Snapshot of what a payload renders to. Embeds and components are serialized since they are mutated in place between renders, \
+        files and views are compared by identity since a new object has to be uploaded or registered anyway.
+        """
+        view = payload["view"]
+        return {
+            "content": None if payload["content"] is None else str(payload["content"]),
+            "embeds": json.dumps([embed.to_dict() for embed in payload["embeds"]], sort_keys = True, default = str),
+            "attachments": tuple(payload["attachments"]),
+            "view": None if view is None else (view, json.dumps(view.to_components(), sort_keys = True, default = str))
+        }
+
+    def _changed_fields(self, payload: dict[str, typing.Any], fingerprint: dict[str, typing.Any]) -> dict[str, typing.Any]:
+        last = self._sent_fingerprint
+        if last is None:
+            changed = dict(payload)
+        else:
+            changed = {key: value for key, value in payload.items() if fingerprint[key] != last[key]}
+        if "content" in changed:
+            changed["allowed_mentions"] = self.blueprint.allowed_mentions or None
+        return changed
+
     async def reply(self, interaction: Interaction):
-        """Reply to an interaction."""
+        """
+        Reply to an interaction.
+        When editing, only the parts that changed since the last reply are sent, \
+        and if nothing changed the interaction is just acknowledged.
+        """
 
+        await auto_defer.disarm(interaction)
         blueprint = self.blueprint
         view = self.view
+        if self.persistent and view is not None:
+            # a finished view is not stored by the library, so nothing is kept in memory
+            view.stop()
+        payload = self._edit_payload()
+        fingerprint = self._fingerprint(payload)
         match interaction.response.is_done(), self.target_message:
             case True, None:
                 self.target_message = await interaction.followup.send(
@@ -194,13 +241,9 @@ class ControlPanel:
                 )
 
             case True, msg:
-                await msg.edit(
-                    content = blueprint.content or None,
-                    embeds = blueprint.embeds if blueprint.embeds else [blueprint.embed] if blueprint.embed else [],
-                    attachments = blueprint.files if blueprint.files else [blueprint.file] if blueprint.file else [],
-                    allowed_mentions = blueprint.allowed_mentions or None,
-                    view = view
-                )
+                changed = self._changed_fields(payload, fingerprint)
+                if changed:
+                    await msg.edit(**changed)
 
             case False, None:
                 await interaction.response.send_message(
@@ -217,18 +260,21 @@ class ControlPanel:
                 self.target_message = await interaction.original_response()
 
             case False, _:
-                await interaction.response.edit_message(
-                    content = blueprint.content or None,
-                    embeds = blueprint.embeds if blueprint.embeds else [blueprint.embed] if blueprint.embed else [],
-                    attachments = blueprint.files if blueprint.files else [blueprint.file] if blueprint.file else [],
-                    allowed_mentions = blueprint.allowed_mentions or None,
-                    view = view
-                )
+                changed = self._changed_fields(payload, fingerprint)
+                if changed:
+                    await interaction.response.edit_message(**changed)
+                else:
+                    await interaction.response.defer()
+
+        self._sent_fingerprint = fingerprint
+        if view is not None and not view.is_finished():
+            interaction.client.view_registry.register(view, type(self).__module__.rpartition(".")[2])
 
     async def thinking(self, interaction: Interaction):
         """
         Reply with "Bot is thinking..."
         """
+        await auto_defer.disarm(interaction)
         thinking_msg = f"<a:typing:1014969925787455558> {interaction.client.user.display_name} is thinking..."
 
         match interaction.response.is_done(), self.target_message:
@@ -237,12 +283,14 @@ class ControlPanel:
 
             case True, msg:
                 await msg.edit(content = thinking_msg, embeds = [], attachments = [])
+                self._sent_fingerprint = None
 
             case False, None:
                 await interaction.response.defer(thinking = True)
 
             case False, _:
                 await interaction.response.edit_message(content = thinking_msg, embeds = [], attachments = [])
+                self._sent_fingerprint = None
 
     async def defer(self, interaction: Interaction, *, ephemeral: bool = MISSING):
         if ephemeral is MISSING:
@@ -250,10 +298,7 @@ class ControlPanel:
         else:
             self.blueprint.ephemeral = ephemeral
 
-        if interaction.response.is_done():
-            pass
-        else:
-            await interaction.response.defer(ephemeral = ephemeral)
+        await auto_defer.defer(interaction, ephemeral = ephemeral)
 
     def stop(self):
         "Stop listening."
@@ -0,0 +1,86 @@
+import discord
+from discord import ui
+import typing
+from collections.abc import Callable, Awaitable
+
+from belphegor import utils
+from . import auto_defer
+from .discord_types import Interaction
+
+#=============================================================================================================================#
+
+log = utils.get_logger()
+
+#=============================================================================================================================#
+
+PREFIX = "bel"
+MAX_CUSTOM_ID_LENGTH = 100
+
+RouteHandler: typing.TypeAlias = Callable[..., Awaitable[typing.Any]]
+
+def encode_custom_id(route: str, *args: typing.Any) -> str:
+    """
+    Pack a route and its arguments into a component custom_id, in the form `bel:route:arg:arg...`. \
+    Arguments must not contain ":" and the result must fit Discord's 100 characters limit.
+    """
+    custom_id = ":".join((PREFIX, route, *map(str, args)))
+    if len(custom_id) > MAX_CUSTOM_ID_LENGTH:
+        raise ValueError(f"Custom id is too long: {custom_id}")
+    return custom_id
+
+def decode_custom_id(custom_id: str) -> tuple[str, list[str]] | None:
+    prefix, _, rest = custom_id.partition(":")
+    if prefix != PREFIX or not rest:
+        return None
+    route, *args = rest.split(":")
+    return route, args
+
+async def exit_panel(interaction: Interaction):
+    view = ui.View.from_message(interaction.message, timeout = None)
+    for item in view.children:
+        item.disabled = True
+    # not stored by the library when finished
+    view.stop()
+    await auto_defer.disarm(interaction)
+    if interaction.response.is_done():
+        await interaction.edit_original_response(view = view)
+    else:
+        await interaction.response.edit_message(view = view)
+
+class PersistentRouter:
+    """
+    Dispatch component interactions of persistent panels. \
+    Such panels keep no view in memory, their state is encoded in each component's custom_id, \
+    and the handler registered for the route rebuilds the panel from it, so they keep working after a restart or a reload. \
+    Handlers are called with the interaction followed by the custom_id arguments as strings.
+    """
+
+    def __init__(self):
+        self.routes: dict[str, RouteHandler] = {"exit": exit_panel}
+
+    def add_route(self, route: str, handler: RouteHandler):
+        self.routes[route] = handler
+
+    def remove_route(self, route: str):
+        self.routes.pop(route, None)
+
+    async def dispatch(self, interaction: Interaction) -> bool:
+        if interaction.type is not discord.InteractionType.component:
+            return False
+        decoded = decode_custom_id(interaction.data.get("custom_id", ""))
+        if decoded is None:
+            return False
+        route, args = decoded
+        handler = self.routes.get(route)
+        if handler is None:
+            log.warning(f"No handler for persistent route {route}")
+            return False
+
+        # same restriction as a private view, the panel belongs to whoever invoked the command
+        original = interaction.message.interaction if interaction.message else None
+        if original is not None and original.user.id != interaction.user.id:
+            return False
+
+        auto_defer.arm(interaction)
+        await handler(interaction, *args)
+        return True
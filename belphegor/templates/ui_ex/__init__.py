@@ -3,4 +3,5 @@ from .buttons import *
 from .selects import *
 from .text_inputs import *
 from .modals import *
-from .views import *
\ No newline at end of file
+from .views import *
+from .registry import *
\ No newline at end of file
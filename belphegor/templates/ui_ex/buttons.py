@@ -6,6 +6,7 @@ from typing_extensions import TypeVar
 
 from belphegor import utils
 from belphegor.templates.discord_types import Interaction
+from .. import auto_defer
 from . import views, items, modals
 
 #=============================================================================================================================#
@@ -58,6 +59,7 @@ class InputButton(BlueButton[_V]):
 
     async def callback(self, interaction: Interaction):
         modal = self.create_modal()
+        await auto_defer.disarm(interaction)
         await interaction.response.send_modal(modal)
 
 class HomeButton(BlueButton[_V]):
@@ -73,7 +75,11 @@ class ExitButton(GrayButton[_V]):
         for item in self.view.children:
             item.disabled = True
 
-        await interaction.response.edit_message(view = self.view)
+        await auto_defer.disarm(interaction)
+        if interaction.response.is_done():
+            await interaction.edit_original_response(view = self.view)
+        else:
+            await interaction.response.edit_message(view = self.view)
 
 class ConfirmedButton(GrayButton[_V]):
     label: str = None
@@ -0,0 +1,164 @@
+import discord
+from discord import ui
+from pydantic import BaseModel
+from collections import OrderedDict, deque
+import asyncio
+import sys
+import time
+import typing
+
+from belphegor import utils
+
+if typing.TYPE_CHECKING:
+    from .views import View
+
+#=============================================================================================================================#
+
+log = utils.get_logger()
+
+#=============================================================================================================================#
+
+_ATOMS = (str, bytes, int, float, bool, type(None))
+
+def _walkable(obj) -> bool:
+    # stay inside the panel graph, everything else (messages, the client, the event loop...) is shared
+    if isinstance(obj, (dict, list, tuple, set, frozenset, deque, BaseModel, discord.Embed, discord.SelectOption, ui.View, ui.Item)):
+        return True
+    if isinstance(obj, type):
+        return False
+    return type(obj).__module__.startswith("belphegor.")
+
+def _children(obj) -> list:
+    if isinstance(obj, dict):
+        return [*obj.keys(), *obj.values()]
+    if isinstance(obj, (list, tuple, set, frozenset, deque)):
+        return list(obj)
+    children = []
+    if hasattr(obj, "__dict__"):
+        children.extend(vars(obj).values())
+    for cls in type(obj).__mro__:
+        for slot in getattr(cls, "__slots__", ()):
+            value = getattr(obj, slot, None)
+            if value is not None:
+                children.append(value)
+    return children
+
+def estimate_size(obj: typing.Any, *, max_nodes: int = 5000, sample: int = 50) -> int:
+    """
+    Rough deep size of an object graph in bytes. Big containers are sampled and extrapolated, \
+    and the walk stops after max_nodes objects, so the cost is bounded whatever the panel holds.
+    """
+    seen = set()
+    total = 0.0
+    stack = [(obj, 1.0)]
+    nodes = 0
+    while stack and nodes < max_nodes:
+        value, weight = stack.pop()
+        if id(value) in seen:
+            continue
+        seen.add(id(value))
+        nodes += 1
+        total += sys.getsizeof(value) * weight
+        if isinstance(value, _ATOMS) or not _walkable(value):
+            continue
+
+        children = _children(value)
+        if len(children) > sample:
+            weight *= len(children) / sample
+            children = children[:sample]
+        stack.extend((child, weight) for child in children)
+
+    return int(total)
+
+#=============================================================================================================================#
+
+class _Entry:
+    __slots__ = ("owner", "size", "last_used")
+
+    def __init__(self, owner: str, size: int, last_used: float):
+        self.owner = owner
+        self.size = size
+        self.last_used = last_used
+
+class ViewRegistry:
+    """
+    Track live views along with the estimated size of their panels. \
+    When there are more than max_views views or they weigh more than max_bytes in total, \
+    the least recently used views that have been idle for at least min_idle seconds are timed out early.
+    """
+
+    def __init__(self, *, max_bytes: int = 64 << 20, max_views: int = 2000, min_idle: float = 30.0):
+        self.max_bytes = max_bytes
+        self.max_views = max_views
+        self.min_idle = min_idle
+        self._entries: OrderedDict["View", _Entry] = OrderedDict()
+        self._bytes = 0
+        self._evicting: set[asyncio.Task] = set()
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, view: "View") -> bool:
+        return view in self._entries
+
+    def register(self, view: "View", owner: str):
+        if view in self._entries:
+            self.touch(view)
+            return
+
+        size = estimate_size(getattr(view, "panel", None) or view)
+        self._entries[view] = _Entry(owner, size, time.monotonic())
+        self._bytes += size
+        view.registry = self
+        self._enforce()
+
+    def touch(self, view: "View"):
+        entry = self._entries.get(view)
+        if entry is not None:
+            entry.last_used = time.monotonic()
+            self._entries.move_to_end(view)
+
+    def discard(self, view: "View"):
+        entry = self._entries.pop(view, None)
+        if entry is not None:
+            self._bytes -= entry.size
+
+    def _enforce(self):
+        now = time.monotonic()
+        while len(self._entries) > self.max_views or self._bytes > self.max_bytes:
+            view, entry = next(iter(self._entries.items()))
+            if now - entry.last_used < self.min_idle:
+                # everything after is more recent, let them be for now
+                break
+            self.evict(view)
+
+    def evict(self, view: "View"):
+        entry = self._entries[view]
+        log.info(f"Evicting idle view {type(view.panel).__name__ if getattr(view, 'panel', None) else type(view).__name__} from {entry.owner} ({entry.size} bytes)")
+        self.discard(view)
+        self.evictions += 1
+        task = asyncio.create_task(self._time_out(view))
+        self._evicting.add(task)
+        task.add_done_callback(self._evicting.discard)
+
+    async def _time_out(self, view: "View"):
+        try:
+            await view.on_timeout()
+        except discord.HTTPException as e:
+            log.warning(f"Failed to time out evicted view: {e!r}")
+
+    def stats(self) -> dict[str, typing.Any]:
+        owners = {}
+        for entry in self._entries.values():
+            owner = owners.setdefault(entry.owner, {"views": 0, "bytes": 0})
+            owner["views"] += 1
+            owner["bytes"] += entry.size
+        return {
+            "views": len(self._entries),
+            "bytes": self._bytes,
+            "max_views": self.max_views,
+            "max_bytes": self.max_bytes,
+            "evictions": self.evictions,
+            "owners": owners
+        }
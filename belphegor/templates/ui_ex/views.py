@@ -3,31 +3,43 @@ from discord import ui
 import typing
 
 from .metas import PostInitable
+from .. import auto_defer
 from ..discord_types import Interaction
 
 if typing.TYPE_CHECKING:
     from ..panels import ControlPanel
+    from .registry import ViewRegistry
 
 #=============================================================================================================================#
 
 class View(PostInitable, ui.View):
     panel: "ControlPanel"
     allowed_user: discord.User
+    registry: "ViewRegistry | None"
 
     def __init__(self, *, timeout: int | float = 300.0, allowed_user: discord.User = None):
         super().__init__(timeout = timeout)
         self.allowed_user = allowed_user
         self.target_messages = set()
+        self.registry = None
 
     def add_exit_button(self, row: int = 0):
         from . import buttons
         self.add_item(buttons.ExitButton(row = row))
 
     async def interaction_check(self, interaction: Interaction) -> bool:
-        if self.allowed_user is None:
+        if self.registry is not None:
+            self.registry.touch(self)
+        if self.allowed_user is None or interaction.user == self.allowed_user:
+            auto_defer.arm(interaction)
             return True
         else:
-            return interaction.user == self.allowed_user
+            return False
+
+    def stop(self):
+        super().stop()
+        if self.registry is not None:
+            self.registry.discard(self)
 
     def shutdown(self):
         self.stop()
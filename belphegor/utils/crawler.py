@@ -0,0 +1,218 @@
+import aiohttp
+import asyncio
+import random
+import time
+import json
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+
+#=============================================================================================================================#
+
+TRANSIENT_STATUSES = frozenset({500, 502, 504})
+THROTTLED_STATUSES = frozenset({429, 503})
+
+class CrawlerError(Exception):
+    def __init__(self, message: str):
+        self.message = message
+
+    def __str__(self):
+        return self.message
+
+class TransientError(CrawlerError):
+    pass
+
+class Throttled(TransientError):
+    def __init__(self, message: str, retry_after: float | None = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+#=============================================================================================================================#
+
+class AIMDLimiter:
+    """
+    Concurrency limiter with additive increase and multiplicative decrease, same as TCP congestion control. \
+    The limit grows by roughly one slot per window of successful requests and is cut down on every throttle signal.
+    """
+
+    def __init__(self, *, initial: int = 2, minimum: int = 1, maximum: int = 16, decrease_factor: float = 0.5, cooldown: float = 1.0):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.decrease_factor = decrease_factor
+        self.cooldown = cooldown
+        self.limit = float(initial)
+        self.in_flight = 0
+        self._condition = asyncio.Condition()
+        self._last_decrease = 0.0
+
+    async def acquire(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+
+    async def release(self):
+        async with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.release()
+
+    def on_success(self):
+        self.limit = min(self.maximum, self.limit + 1 / self.limit)
+
+    def on_throttle(self):
+        # requests that were already in flight usually fail together, only count them as one signal
+        current = time.monotonic()
+        if current - self._last_decrease >= self.cooldown:
+            self._last_decrease = current
+            self.limit = max(self.minimum, self.limit * self.decrease_factor)
+
+#=============================================================================================================================#
+
+def parse_retry_after(value: str | None) -> float | None:
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        dt = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo = timezone.utc)
+    return max(0.0, (dt - datetime.now(timezone.utc)).total_seconds())
+
+class CrawlerClient:
+    """
+    Polite JSON client for crawling wikis on top of a shared aiohttp session. \
+    Concurrency is controlled by an AIMD limiter, `Retry-After` and MediaWiki `maxlag` responses pause all requests, \
+    and transient failures are retried with jittered exponential backoff.
+    """
+
+    def __init__(
+        self,
+        session: aiohttp.ClientSession,
+        *,
+        headers: dict[str, str] | None = None,
+        maxlag: int | None = 5,
+        max_retries: int = 5,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+        initial_concurrency: int = 2,
+        max_concurrency: int = 16
+    ):
+        self.session = session
+        self.headers = headers
+        self.maxlag = maxlag
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.limiter = AIMDLimiter(initial = initial_concurrency, maximum = max_concurrency)
+        self._resume_at = 0.0
+
+        self.requests = 0
+        self.successes = 0
+        self.retries = 0
+        self.throttled = 0
+        self.failures = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    def stats(self, since: dict[str, int | float] | None = None) -> dict[str, int | float]:
+        """
+        Lifetime stats of the client. With since, an earlier result of this method, \
+        the counters and the average latency only cover what happened after it, latency_max and concurrency stay as is.
+        """
+        stats = {
+            "requests": self.requests,
+            "successes": self.successes,
+            "retries": self.retries,
+            "throttled": self.throttled,
+            "failures": self.failures,
+            "latency_total": self.latency_total,
+            "latency_max": self.latency_max,
+            "concurrency": int(self.limiter.limit)
+        }
+        if since is not None:
+            for key in ("requests", "successes", "retries", "throttled", "failures", "latency_total"):
+                stats[key] -= since[key]
+        stats["latency_avg"] = stats["latency_total"] / stats["requests"] if stats["requests"] else 0.0
+        return stats
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def _pause(self, delay: float):
+        loop = asyncio.get_running_loop()
+        self._resume_at = max(self._resume_at, loop.time() + delay)
+
+    async def _wait_for_resume(self):
+        loop = asyncio.get_running_loop()
+        while (delay := self._resume_at - loop.time()) > 0:
+            await asyncio.sleep(delay)
+
+    async def _request_json(self, url: str, params: dict) -> dict:
+        await self._wait_for_resume()
+        async with self.limiter:
+            start = time.perf_counter()
+            try:
+                async with self.session.get(url, params = params, headers = self.headers) as resp:
+                    status = resp.status
+                    retry_after = parse_retry_after(resp.headers.get("Retry-After"))
+                    body = await resp.read()
+            finally:
+                latency = time.perf_counter() - start
+                self.requests += 1
+                self.latency_total += latency
+                self.latency_max = max(self.latency_max, latency)
+
+        if status in THROTTLED_STATUSES:
+            raise Throttled(f"HTTP {status}", retry_after)
+        elif status in TRANSIENT_STATUSES:
+            raise TransientError(f"HTTP {status}")
+        elif status >= 400:
+            raise CrawlerError(f"HTTP {status} for {url}")
+
+        data = json.loads(body)
+        error = data.get("error") if isinstance(data, dict) else None
+        if error and error.get("code") == "maxlag":
+            raise Throttled(f"Server lagged: {error.get('info', '')}", retry_after or float(error.get("lag", 5)))
+        return data
+
+    async def get_json(self, url: str, *, params: dict | None = None) -> dict:
+        params = dict(params or {})
+        if self.maxlag is not None:
+            params.setdefault("maxlag", self.maxlag)
+
+        attempt = 0
+        while True:
+            try:
+                data = await self._request_json(url, params)
+            except Throttled as e:
+                self.throttled += 1
+                self.limiter.on_throttle()
+                delay = max(e.retry_after or 0.0, self._backoff(attempt))
+                self._pause(delay)
+            except (TransientError, aiohttp.ClientConnectionError, aiohttp.ClientPayloadError, asyncio.TimeoutError):
+                self.limiter.on_throttle()
+                delay = self._backoff(attempt)
+            except:
+                self.failures += 1
+                raise
+            else:
+                self.successes += 1
+                self.limiter.on_success()
+                return data
+
+            attempt += 1
+            if attempt > self.max_retries:
+                self.failures += 1
+                raise CrawlerError(f"Gave up on {url} after {attempt} attempts.")
+            self.retries += 1
+            await asyncio.sleep(delay)
@@ -0,0 +1,195 @@
+import aiohttp
+from yarl import URL
+import bisect
+import re
+import time
+import typing
+from types import SimpleNamespace
+
+#=============================================================================================================================#
+
+# seconds, fine grained around Discord's 3 seconds interaction deadline
+DEFAULT_BUCKETS = (0.025, 0.05, 0.1, 0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 2.5, 3.0, 5.0, 10.0)
+
+Labels: typing.TypeAlias = tuple[tuple[str, str], ...]
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "count", "sum", "max")
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        # last slot is +Inf
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket containing the q-quantile, or the max seen if it's in the +Inf bucket."""
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def to_dict(self) -> dict[str, typing.Any]:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "max": self.max,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+            "buckets": {str(bound): count for bound, count in zip((*self.buckets, "+Inf"), self.counts)}
+        }
+
+def _escape_label(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+class MetricsRegistry:
+    """
+    Labelled histograms and counters kept in memory, exported as JSON or in Prometheus text format.
+    """
+
+    def __init__(self):
+        self.histograms: dict[str, dict[Labels, Histogram]] = {}
+        self.counters: dict[str, dict[Labels, float]] = {}
+        self.descriptions: dict[str, str] = {}
+        self.started_at = time.time()
+
+    def describe(self, name: str, description: str):
+        self.descriptions[name] = description
+
+    def observe(self, name: str, value: float, **labels: str):
+        key = tuple(sorted(labels.items()))
+        series = self.histograms.setdefault(name, {})
+        histogram = series.get(key)
+        if histogram is None:
+            histogram = series[key] = Histogram()
+        histogram.observe(value)
+
+    def inc(self, name: str, amount: float = 1, **labels: str):
+        key = tuple(sorted(labels.items()))
+        series = self.counters.setdefault(name, {})
+        series[key] = series.get(key, 0) + amount
+
+    def reset(self):
+        self.histograms.clear()
+        self.counters.clear()
+        self.started_at = time.time()
+
+    def to_dict(self) -> dict[str, typing.Any]:
+        return {
+            "started_at": self.started_at,
+            "histograms": {
+                name: [{"labels": dict(labels), **histogram.to_dict()} for labels, histogram in series.items()]
+                for name, series in self.histograms.items()
+            },
+            "counters": {
+                name: [{"labels": dict(labels), "value": value} for labels, value in series.items()]
+                for name, series in self.counters.items()
+            }
+        }
+
+    def to_prometheus(self) -> str:
+        lines = []
+
+        def format_labels(labels: Labels | list[tuple[str, str]]) -> str:
+            if not labels:
+                return ""
+            return "{" + ",".join(f'{key}="{_escape_label(value)}"' for key, value in labels) + "}"
+
+        for name, series in self.histograms.items():
+            if name in self.descriptions:
+                lines.append(f"# HELP {name} {self.descriptions[name]}")
+            lines.append(f"# TYPE {name} histogram")
+            for labels, histogram in series.items():
+                cumulative = 0
+                for bound, count in zip((*histogram.buckets, "+Inf"), histogram.counts):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{format_labels([*labels, ('le', str(bound))])} {cumulative}")
+                lines.append(f"{name}_sum{format_labels(labels)} {histogram.sum}")
+                lines.append(f"{name}_count{format_labels(labels)} {histogram.count}")
+
+        for name, series in self.counters.items():
+            if name in self.descriptions:
+                lines.append(f"# HELP {name} {self.descriptions[name]}")
+            lines.append(f"# TYPE {name} counter")
+            for labels, value in series.items():
+                lines.append(f"{name}{format_labels(labels)} {value}")
+
+        return "\n".join(lines) + "\n"
+
+#=============================================================================================================================#
+
+_API_VERSION = re.compile(r"^/api/v\d+")
+_SNOWFLAKE = re.compile(r"^\d{15,21}$")
+
+def discord_route(method: str, url: URL) -> str:
+    """
+    Group Discord API requests by route, like `PATCH /webhooks/{id}/{token}/messages/@original`. \
+    Ids, interaction and webhook tokens, and reaction emojis are replaced by placeholders.
+    """
+    if url.host not in ("discord.com", "discordapp.com"):
+        return f"{method} {url.host}"
+
+    parts = _API_VERSION.sub("", url.path).split("/")
+    for i, part in enumerate(parts):
+        if _SNOWFLAKE.match(part):
+            parts[i] = "{id}"
+        elif i >= 2 and parts[i - 2] in ("interactions", "webhooks"):
+            parts[i] = "{token}"
+        elif i >= 1 and parts[i - 1] == "reactions":
+            parts[i] = "{emoji}"
+    return f"{method} {'/'.join(parts)}"
+
+def http_trace(registry: MetricsRegistry) -> aiohttp.TraceConfig:
+    """
+    Trace config for the Discord HTTP client, pass it as `http_trace` to the client. \
+    Records latency per route and status, 429s with their retry delay, \
+    and the wait announced when a bucket is exhausted, which the library sleeps before the next request on that bucket.
+    """
+    registry.describe("discord_http_request_seconds", "Discord API request latency by route and status")
+    registry.describe("discord_http_errors_total", "Discord API requests failed without a response")
+    registry.describe("discord_ratelimited_total", "429 responses by route and scope")
+    registry.describe("discord_ratelimit_retry_seconds", "Retry delay of 429 responses")
+    registry.describe("discord_bucket_wait_seconds", "Wait before the next request once a bucket is exhausted")
+
+    async def on_request_start(session: aiohttp.ClientSession, context: SimpleNamespace, params: aiohttp.TraceRequestStartParams):
+        context.start = time.perf_counter()
+
+    async def on_request_end(session: aiohttp.ClientSession, context: SimpleNamespace, params: aiohttp.TraceRequestEndParams):
+        elapsed = time.perf_counter() - context.start
+        route = discord_route(params.method, params.url)
+        response = params.response
+        registry.observe("discord_http_request_seconds", elapsed, route = route, status = str(response.status))
+
+        headers = response.headers
+        if response.status == 429:
+            registry.inc("discord_ratelimited_total", route = route, scope = headers.get("X-RateLimit-Scope", "unknown"))
+            retry_after = headers.get("Retry-After")
+            if retry_after is not None:
+                registry.observe("discord_ratelimit_retry_seconds", float(retry_after), route = route)
+        elif headers.get("X-RateLimit-Remaining") == "0":
+            reset_after = headers.get("X-RateLimit-Reset-After")
+            if reset_after is not None:
+                registry.observe("discord_bucket_wait_seconds", float(reset_after), route = route)
+
+    async def on_request_exception(session: aiohttp.ClientSession, context: SimpleNamespace, params: aiohttp.TraceRequestExceptionParams):
+        registry.inc("discord_http_errors_total", route = discord_route(params.method, params.url), error = type(params.exception).__name__)
+
+    trace = aiohttp.TraceConfig()
+    trace.on_request_start.append(on_request_start)
+    trace.on_request_end.append(on_request_end)
+    trace.on_request_exception.append(on_request_exception)
+    return trace
@@ -49,6 +49,77 @@ class ConcatJSONDecoder(json.JSONDecoder):
 
 load_concat_json: Callable[[str], dict|list] = functools.partial(json.loads, cls=ConcatJSONDecoder)
 
+class JSONArrayStreamDecoder:
+    """
+    Decode elements of a top-level JSON array incrementally as text chunks arrive, \
+    so the whole array never has to be in memory at once.
+    """
+
+    def __init__(self):
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._state = "start"
+
+    def _decode(self, final: bool) -> list:
+        buffer = self._buffer
+        size = len(buffer)
+        items = []
+        pos = 0
+        while True:
+            pos = _WHITESPACE.match(buffer, pos).end()
+            if pos >= size:
+                break
+
+            match self._state:
+                case "start":
+                    if buffer[pos] != "[":
+                        raise ValueError("Expected a JSON array.")
+                    pos += 1
+                    self._state = "first"
+                case "first" | "value":
+                    if self._state == "first" and buffer[pos] == "]":
+                        pos += 1
+                        self._state = "end"
+                        continue
+                    try:
+                        obj, end = self._decoder.raw_decode(buffer, pos)
+                    except json.JSONDecodeError:
+                        if final:
+                            raise
+                        break
+                    # only accept an element once its separator has arrived, since a number cut at
+                    # the end of a chunk is still valid json, e.g. "1.5" cut into "1" and ".5"
+                    after = _WHITESPACE.match(buffer, end).end()
+                    if not final and (after >= size or buffer[after] not in ",]"):
+                        break
+                    items.append(obj)
+                    pos = end
+                    self._state = "separator"
+                case "separator":
+                    c = buffer[pos]
+                    pos += 1
+                    if c == ",":
+                        self._state = "value"
+                    elif c == "]":
+                        self._state = "end"
+                    else:
+                        raise ValueError(f"Unexpected character {c!r} between array elements.")
+                case "end":
+                    raise ValueError("Extra data after JSON array.")
+
+        self._buffer = buffer[pos:]
+        return items
+
+    def feed(self, chunk: str) -> list:
+        self._buffer += chunk
+        return self._decode(False)
+
+    def close(self) -> list:
+        items = self._decode(True)
+        if self._state != "end":
+            raise ValueError("Unterminated JSON array.")
+        return items
+
 #=============================================================================================================================#
 
 def clean_codeblock(text: str) -> str:
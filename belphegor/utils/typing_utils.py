@@ -1,12 +1,14 @@
 __all__ = [
     "copy_signature",
     "__dataclass_transform__",
+    "get_class_hints",
     "get_default_attribute"
 ]
 
 #=============================================================================================================================#
 
 import typing
+import weakref
 from collections.abc import Callable
 
 #=============================================================================================================================#
@@ -29,7 +31,18 @@ def __dataclass_transform__(
 ) -> Callable[[_T], _T]:
     return lambda a: a
 
+_type_hints_cache: weakref.WeakKeyDictionary[type, dict[str, typing.Any]] = weakref.WeakKeyDictionary()
+
+def get_class_hints(cls: type) -> dict[str, typing.Any]:
+    """
+    Resolved type hints of a class, computed once per class. \
+    Annotations of a class don't change after it's created, and resolving them evaluates every string annotation along the MRO.
+    """
+    hints = _type_hints_cache.get(cls)
+    if hints is None:
+        from typing_extensions import Self
+        hints = _type_hints_cache[cls] = typing.get_type_hints(cls, localns = {"Self": Self})
+    return hints
+
 def get_default_attribute(obj, key: str, *args, **kwargs):
-    from typing_extensions import Self
-    hints = typing.get_type_hints(type(obj), localns = locals())
-    return hints[key](*args, **kwargs)
+    return get_class_hints(type(obj))[key](*args, **kwargs)
@@ -1,6 +1,7 @@
 import functools
 import hashlib
 import collections
+import zstandard
 
 from . import string_utils
 
@@ -11,6 +12,12 @@ def generate_image_path(filename):
     name_hash = hashlib.md5(filename.encode("utf-8")).hexdigest()
     return f"images/{name_hash[0]}/{name_hash[:2]}/{filename}"
 
+def compress_wikitext(text: str, *, level: int = 10) -> bytes:
+    return zstandard.ZstdCompressor(level = level).compress(text.encode("utf-8"))
+
+def decompress_wikitext(data: bytes) -> str:
+    return zstandard.ZstdDecompressor().decompress(data).decode("utf-8")
+
 #=============================================================================================================================#
 
 class ParsingError(Exception):